@@ -8,9 +8,16 @@ from flask import Flask, jsonify, request
 from flask_cors import CORS
 import pandas as pd
 import os
+import math
+import threading
+import time
 from datetime import datetime
+from functools import lru_cache, wraps
+import numpy as np
 import json
 
+from nlp import incremental
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
@@ -55,8 +62,12 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # ===============================
 # Global data cache
 # ===============================
-_data_cache = {}
-_cache_timestamp = {}
+_data_cache = {}       # company -> list of JSON records
+_frame_cache = {}      # company -> columnar DataFrame used for filtering/queries
+_cache_signature = {}  # company -> published (mtime_ns, size) of the CSV the cache was built from
+
+# Sentiment labels mapped to numeric scores (same scale as drift_detection.py)
+SENTIMENT_SCORES = {"POSITIVE": 1, "NEUTRAL": 0, "NEGATIVE": -1}
 
 def get_data_file(company):
     """Get the data file path for a company"""
@@ -64,9 +75,46 @@ def get_data_file(company):
         return None
     return os.path.join(BASE_DIR, COMPANIES[company]["file"])
 
-def load_data(company="microsoft"):
-    """Load sentiment data from CSV for a specific company"""
-    global _data_cache, _cache_timestamp
+def _build_frame(df, company):
+    """
+    Normalize a raw sentiment CSV into the columns the API works on.
+    Derived columns (score, day/week/month buckets) are computed once here
+    so that filters and group-bys are plain column operations.
+    """
+    n = len(df)
+    created = df["createdAt"]
+
+    frame = pd.DataFrame({
+        "id": df["id"].astype(str) if "id" in df.columns else pd.Series([""] * n, index=df.index),
+        "text": df["text"].astype(str) if "text" in df.columns else pd.Series([""] * n, index=df.index),
+        "createdAt": created,
+        "sentiment": (
+            df["sentiment"].astype(str).str.upper()
+            if "sentiment" in df.columns else pd.Series(["NEUTRAL"] * n, index=df.index)
+        ),
+        "source": (
+            df["source"].fillna("unknown").astype(str)
+            if "source" in df.columns else pd.Series(["unknown"] * n, index=df.index)
+        ),
+        "rating": (
+            pd.to_numeric(df["rating"], errors="coerce")
+            if "rating" in df.columns else pd.Series([float("nan")] * n, index=df.index)
+        ),
+    }).reset_index(drop=True)
+
+    frame["company"] = company
+    frame["score"] = frame["sentiment"].map(SENTIMENT_SCORES).astype(float)
+    frame["day"] = frame["createdAt"].dt.strftime("%Y-%m-%d")
+    frame["week"] = (
+        frame["createdAt"].dt.normalize()
+        - pd.to_timedelta(frame["createdAt"].dt.weekday, unit="D")
+    ).dt.strftime("%Y-%m-%d")
+    frame["month"] = frame["createdAt"].dt.strftime("%Y-%m")
+    return frame
+
+def _load_company(company):
+    """Load and cache (frame, records) for a company, or None"""
+    global _data_cache, _frame_cache, _cache_signature
     
     if company not in COMPANIES:
         print(f"[WARNING] Unknown company: {company}")
@@ -74,41 +122,332 @@ def load_data(company="microsoft"):
     
     data_file = get_data_file(company)
     
-    if not os.path.exists(data_file):
+    try:
+        signature = incremental.published_signature(data_file)
+    except OSError:
         print(f"[WARNING] Data file not found: {data_file}")
         return None
     
-    # Cache for 5 seconds per company
-    now = datetime.now()
-    if company in _data_cache and company in _cache_timestamp:
-        if (now - _cache_timestamp[company]).total_seconds() < 5:
-            return _data_cache[company]
+    # Reuse the cache until the pipeline publishes new rows. Full writes are
+    # swapped in atomically (os.replace) and appends only count once their
+    # commit pointer moves, so a changed signature always points at complete
+    # rows and the read below stops at the committed length.
+    if _cache_signature.get(company) == signature and company in _data_cache:
+        return _frame_cache[company], _data_cache[company]
     
     try:
-        df = pd.read_csv(data_file)
+        df = incremental.read_published_csv(data_file)
         print(f"[DATA] Loaded {len(df)} records from {data_file}")
         
         df["createdAt"] = pd.to_datetime(df["createdAt"], errors="coerce")
         df = df.dropna(subset=["createdAt"])
+        frame = _build_frame(df, company)
         
         # Convert to list of dicts for JSON serialization
-        data = []
-        for _, row in df.iterrows():
-            data.append({
-                "id": str(row.get("id", "")),
-                "text": str(row.get("text", "")),
-                "createdAt": row["createdAt"].isoformat(),
-                "sentiment": str(row.get("sentiment", "Neutral")).upper(),
+        data = [
+            {
+                "id": record_id,
+                "text": text,
+                "createdAt": created.isoformat(),
+                "sentiment": sentiment,
                 "company": company
-            })
+            }
+            for record_id, text, created, sentiment in zip(
+                frame["id"], frame["text"], frame["createdAt"], frame["sentiment"]
+            )
+        ]
         
+        _frame_cache[company] = frame
         _data_cache[company] = data
-        _cache_timestamp[company] = now
-        return data
+        _cache_signature[company] = signature
+        return frame, data
     except Exception as e:
         print(f"[ERROR] Error loading data for {company}: {e}")
         return None
 
+def load_data(company="microsoft"):
+    """Load sentiment data from CSV for a specific company"""
+    loaded = _load_company(company)
+    return loaded[1] if loaded is not None else None
+
+def load_frame(company="microsoft"):
+    """Load the columnar DataFrame for a specific company"""
+    loaded = _load_company(company)
+    return loaded[0] if loaded is not None else None
+
+# ===============================
+# Filtering & Query Planning
+# ===============================
+QUERY_GROUP_KEYS = ("sentiment", "day", "week", "month", "source")
+QUERY_AGGREGATES = ("count", "share", "mean_score")
+
+
+def _split_param(value):
+    """Split a comma-separated query parameter into a tuple of tokens"""
+    if not value:
+        return ()
+    return tuple(token.strip() for token in value.split(",") if token.strip())
+
+
+def _parse_bound(value, name):
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name}: {value}")
+
+
+@lru_cache(maxsize=256)
+def compile_query(sentiments, start_date, end_date, sources=(), min_rating=None,
+                  max_rating=None, group_by=(), aggregates=()):
+    """
+    Validate and compile query parameters into a plan.
+    Plans are cached, so repeated dashboard queries skip parsing entirely.
+    Raises ValueError for invalid input.
+    """
+    plan = {
+        "sentiments": tuple(s.upper() for s in sentiments),
+        "start": None,
+        "end": None,
+        "sources": tuple(sources),
+        "min_rating": _parse_bound(min_rating, "minRating"),
+        "max_rating": _parse_bound(max_rating, "maxRating"),
+        "group_by": tuple(group_by),
+        "aggregates": tuple(aggregates) or ("count",),
+    }
+
+    # Date range is only applied when both ends are given
+    if start_date and end_date:
+        try:
+            plan["start"] = pd.Timestamp(datetime.fromisoformat(start_date))
+            plan["end"] = pd.Timestamp(datetime.fromisoformat(end_date))
+        except ValueError as e:
+            raise ValueError(f"Invalid date format: {e}")
+
+    unknown_keys = [key for key in plan["group_by"] if key not in QUERY_GROUP_KEYS]
+    if unknown_keys:
+        raise ValueError(
+            f"Unsupported groupBy: {', '.join(unknown_keys)} "
+            f"(supported: {', '.join(QUERY_GROUP_KEYS)})"
+        )
+
+    unknown_aggs = [agg for agg in plan["aggregates"] if agg not in QUERY_AGGREGATES]
+    if unknown_aggs:
+        raise ValueError(
+            f"Unsupported aggregates: {', '.join(unknown_aggs)} "
+            f"(supported: {', '.join(QUERY_AGGREGATES)})"
+        )
+
+    return plan
+
+
+def plan_from_request(args, with_grouping=False):
+    """Build (or fetch the cached) query plan for the current request"""
+    sentiments = _split_param(args.get("sentiments", "POSITIVE,NEUTRAL,NEGATIVE"))
+    kwargs = {}
+    if with_grouping:
+        kwargs = {
+            "sources": _split_param(args.get("source")),
+            "min_rating": args.get("minRating"),
+            "max_rating": args.get("maxRating"),
+            "group_by": _split_param(args.get("groupBy")),
+            "aggregates": _split_param(args.get("aggregates")),
+        }
+    return compile_query(sentiments, args.get("startDate"), args.get("endDate"), **kwargs)
+
+
+def filter_mask(frame, plan):
+    """Boolean mask over `frame` for the filters in `plan`"""
+    # A copy, so the mask is writable for the in-place &= below (under
+    # copy-on-write to_numpy() returns a read-only view)
+    mask = frame["sentiment"].isin(plan["sentiments"]).to_numpy(copy=True)
+
+    if plan["start"] is not None:
+        created = frame["createdAt"]
+        start, end = plan["start"], plan["end"]
+        if created.dt.tz is not None and start.tzinfo is None:
+            start, end = start.tz_localize(created.dt.tz), end.tz_localize(created.dt.tz)
+        mask &= ((created >= start) & (created <= end)).to_numpy()
+
+    if plan["sources"]:
+        mask &= frame["source"].isin(plan["sources"]).to_numpy()
+    if plan["min_rating"] is not None:
+        mask &= (frame["rating"] >= plan["min_rating"]).to_numpy()
+    if plan["max_rating"] is not None:
+        mask &= (frame["rating"] <= plan["max_rating"]).to_numpy()
+
+    return mask
+
+
+def run_query(frame, plan):
+    """Execute a compiled plan as vectorized filter + group-by aggregation"""
+    selected = frame[filter_mask(frame, plan)]
+    total = len(selected)
+    group_by = list(plan["group_by"])
+    aggregates = plan["aggregates"]
+
+    if not group_by:
+        row = {}
+        if "count" in aggregates:
+            row["count"] = total
+        if "share" in aggregates:
+            row["share"] = 1.0 if total > 0 else 0.0
+        if "mean_score" in aggregates:
+            row["mean_score"] = float(selected["score"].mean()) if total > 0 else None
+        return [row], total
+
+    grouped = selected.groupby(group_by, sort=True)["score"].agg(["size", "mean"]).reset_index()
+
+    result = grouped[group_by].copy()
+    if "count" in aggregates:
+        result["count"] = grouped["size"].astype(int)
+    if "share" in aggregates:
+        result["share"] = grouped["size"] / total if total > 0 else 0.0
+    if "mean_score" in aggregates:
+        result["mean_score"] = grouped["mean"]
+
+    return result.to_dict("records"), total
+
+# ===============================
+# Admission Control
+# ===============================
+# Expensive routes get their own concurrency limit and a bounded wait
+# queue, so a burst of heavy requests cannot starve cheap endpoints such
+# as /api/companies or /api/health (those are never admission controlled).
+ADMISSION_LIMITS = {
+    "data": {"max_concurrent": 4, "max_queue": 16, "queue_timeout": 2.0},
+    "statistics": {"max_concurrent": 4, "max_queue": 16, "queue_timeout": 2.0},
+    "timeline": {"max_concurrent": 2, "max_queue": 8, "queue_timeout": 2.0},
+    "date-range": {"max_concurrent": 4, "max_queue": 16, "queue_timeout": 1.0},
+    "query": {"max_concurrent": 4, "max_queue": 16, "queue_timeout": 2.0},
+}
+
+
+class AdmissionController:
+    """
+    Per-route concurrency limiter with a bounded, deadline-aware wait queue.
+
+    - At most `max_concurrent` requests run at once.
+    - Up to `max_queue` further requests wait, each for at most
+      `queue_timeout` seconds.
+    - A request arriving at a full queue is rejected at once (429); a
+      request whose wait deadline expires is rejected with 503.
+    """
+
+    def __init__(self, name, max_concurrent, max_queue, queue_timeout):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._cond = threading.Condition()
+        self.active = 0
+        self.waiting = 0
+        self.peak_waiting = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self._avg_service_time = 0.0
+
+    def acquire(self):
+        """
+        Try to admit a request.
+        Returns None when admitted, otherwise (status_code, retry_after).
+        """
+        with self._cond:
+            if self.active < self.max_concurrent and self.waiting == 0:
+                self.active += 1
+                self.admitted += 1
+                return None
+
+            if self.waiting >= self.max_queue:
+                self.rejected_queue_full += 1
+                return 429, self._retry_after()
+
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self.active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected_timeout += 1
+                        return 503, self._retry_after()
+                    self._cond.wait(remaining)
+            finally:
+                self.waiting -= 1
+
+            self.active += 1
+            self.admitted += 1
+            return None
+
+    def release(self, service_time):
+        with self._cond:
+            self.active -= 1
+            # Exponentially weighted average, used for Retry-After hints
+            if self._avg_service_time == 0.0:
+                self._avg_service_time = service_time
+            else:
+                self._avg_service_time = 0.8 * self._avg_service_time + 0.2 * service_time
+            self._cond.notify()
+
+    def _retry_after(self):
+        """Seconds until the current backlog is expected to drain"""
+        backlog = self.active + self.waiting + 1
+        estimate = self._avg_service_time * backlog / self.max_concurrent
+        return max(1, math.ceil(estimate))
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "queue_timeout": self.queue_timeout,
+                "active": self.active,
+                "queue_depth": self.waiting,
+                "peak_queue_depth": self.peak_waiting,
+                "admitted": self.admitted,
+                "rejected_queue_full": self.rejected_queue_full,
+                "rejected_timeout": self.rejected_timeout,
+                "avg_service_ms": round(self._avg_service_time * 1000, 2),
+            }
+
+
+_admission_controllers = {
+    name: AdmissionController(name, **limits)
+    for name, limits in ADMISSION_LIMITS.items()
+}
+
+
+def admission_controlled(route_name):
+    """Decorator that runs a route under its AdmissionController"""
+    controller = _admission_controllers[route_name]
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            rejection = controller.acquire()
+            if rejection is not None:
+                status, retry_after = rejection
+                reason = "queue full" if status == 429 else "queue wait timed out"
+                response = jsonify({
+                    "error": f"Server busy ({reason}), retry later",
+                    "route": route_name,
+                    "retry_after": retry_after
+                })
+                response.status_code = status
+                response.headers["Retry-After"] = str(retry_after)
+                return response
+
+            start = time.monotonic()
+            try:
+                return view(*args, **kwargs)
+            finally:
+                controller.release(time.monotonic() - start)
+        return wrapper
+    return decorator
+
 # ===============================
 # API Routes
 # ===============================
@@ -130,6 +469,7 @@ def get_companies():
 
 
 @app.route("/api/data", methods=["GET"])
+@admission_controlled("data")
 def get_data():
     """
     Get filtered sentiment data
@@ -143,36 +483,19 @@ def get_data():
     print("[API] GET /api/data called")
     
     company = request.args.get("company", "microsoft").lower()
-    data = load_data(company)
+    loaded = _load_company(company)
     
-    if data is None:
+    if loaded is None:
         print("[ERROR] No data available")
         return jsonify({"error": f"Data not available for {company}. Run pipeline first."}), 404
+    frame, data = loaded
     
-    # Parse filters
-    sentiments = request.args.get("sentiments", "POSITIVE,NEUTRAL,NEGATIVE").split(",")
-    sentiments = [s.strip().upper() for s in sentiments]
-    
-    start_date_str = request.args.get("startDate")
-    end_date_str = request.args.get("endDate")
-    
-    filtered_data = data
+    try:
+        plan = plan_from_request(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
-    # Filter by sentiment
-    filtered_data = [d for d in filtered_data if d["sentiment"] in sentiments]
-    
-    # Filter by date range
-    if start_date_str and end_date_str:
-        try:
-            start_date = datetime.fromisoformat(start_date_str)
-            end_date = datetime.fromisoformat(end_date_str)
-            
-            filtered_data = [
-                d for d in filtered_data
-                if start_date <= datetime.fromisoformat(d["createdAt"]) <= end_date
-            ]
-        except ValueError as e:
-            return jsonify({"error": f"Invalid date format: {e}"}), 400
+    filtered_data = [data[i] for i in np.flatnonzero(filter_mask(frame, plan))]
     
     return jsonify({
         "data": filtered_data,
@@ -182,6 +505,7 @@ def get_data():
     })
 
 @app.route("/api/statistics", methods=["GET"])
+@admission_controlled("statistics")
 def get_statistics():
     """
     Get statistics about the data
@@ -193,43 +517,23 @@ def get_statistics():
     - endDate: ISO date string (YYYY-MM-DD)
     """
     company = request.args.get("company", "microsoft").lower()
-    data = load_data(company)
+    frame = load_frame(company)
     
-    if data is None:
+    if frame is None:
         return jsonify({"error": f"Data not available for {company}"}), 404
     
-    # Parse filters (same as /api/data)
-    sentiments = request.args.get("sentiments", "POSITIVE,NEUTRAL,NEGATIVE").split(",")
-    sentiments = [s.strip().upper() for s in sentiments]
-    
-    start_date_str = request.args.get("startDate")
-    end_date_str = request.args.get("endDate")
-    
-    filtered_data = data
-    
-    # Filter by sentiment
-    filtered_data = [d for d in filtered_data if d["sentiment"] in sentiments]
-    
-    # Filter by date range
-    if start_date_str and end_date_str:
-        try:
-            start_date = datetime.fromisoformat(start_date_str)
-            end_date = datetime.fromisoformat(end_date_str)
-            
-            filtered_data = [
-                d for d in filtered_data
-                if start_date <= datetime.fromisoformat(d["createdAt"]) <= end_date
-            ]
-        except ValueError as e:
-            return jsonify({"error": f"Invalid date format: {e}"}), 400
+    try:
+        plan = plan_from_request(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     
     # Calculate statistics
-    positive_count = sum(1 for d in filtered_data if d["sentiment"] == "POSITIVE")
-    neutral_count = sum(1 for d in filtered_data if d["sentiment"] == "NEUTRAL")
-    negative_count = sum(1 for d in filtered_data if d["sentiment"] == "NEGATIVE")
+    counts = frame["sentiment"][filter_mask(frame, plan)].value_counts()
+    positive_count = int(counts.get("POSITIVE", 0))
+    neutral_count = int(counts.get("NEUTRAL", 0))
+    negative_count = int(counts.get("NEGATIVE", 0))
     
-    total_count = len(filtered_data)
-    all_data = load_data(company) or []
+    total_count = int(counts.sum())
     
     return jsonify({
         "total": total_count,
@@ -239,12 +543,50 @@ def get_statistics():
         "positive_percentage": (positive_count / total_count * 100) if total_count > 0 else 0,
         "neutral_percentage": (neutral_count / total_count * 100) if total_count > 0 else 0,
         "negative_percentage": (negative_count / total_count * 100) if total_count > 0 else 0,
-        "all_data_total": len(all_data),
+        "all_data_total": len(frame),
+        "company": company,
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route("/api/query", methods=["GET"])
+@admission_controlled("query")
+def query():
+    """
+    Generic filtered, grouped aggregation over a company's data
+    
+    Query parameters:
+    - company: company ID (default: microsoft)
+    - sentiments: comma-separated list (POSITIVE, NEUTRAL, NEGATIVE)
+    - startDate / endDate: ISO date strings (YYYY-MM-DD), both required to filter
+    - source: comma-separated list of sources (e.g. glassdoor.com)
+    - minRating / maxRating: numeric rating bounds
+    - groupBy: comma-separated list of sentiment, day, week, month, source
+    - aggregates: comma-separated list of count, share, mean_score (default: count)
+    """
+    company = request.args.get("company", "microsoft").lower()
+    frame = load_frame(company)
+    
+    if frame is None:
+        return jsonify({"error": f"Data not available for {company}"}), 404
+    
+    try:
+        plan = plan_from_request(request.args, with_grouping=True)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    groups, total = run_query(frame, plan)
+    
+    return jsonify({
+        "groups": groups,
+        "total": total,
+        "groupBy": list(plan["group_by"]),
+        "aggregates": list(plan["aggregates"]),
         "company": company,
         "timestamp": datetime.now().isoformat()
     })
 
 @app.route("/api/date-range", methods=["GET"])
+@admission_controlled("date-range")
 def get_date_range():
     """Get the min and max dates available in the dataset"""
     company = request.args.get("company", "microsoft").lower()
@@ -267,6 +609,7 @@ def get_date_range():
     })
 
 @app.route("/api/timeline", methods=["GET"])
+@admission_controlled("timeline")
 def get_timeline():
     """Get sentiment timeline data grouped by date"""
     company = request.args.get("company", "microsoft").lower()
@@ -318,6 +661,26 @@ def health():
         "data_file_exists": os.path.exists(data_file) if data_file else False
     })
 
+@app.route("/api/ready", methods=["GET"])
+def ready():
+    """Readiness probe: answers as soon as the server accepts requests (no data load)"""
+    return jsonify({
+        "ready": True,
+        "loaded_companies": sorted(_data_cache.keys()),
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route("/api/metrics", methods=["GET"])
+def metrics():
+    """Admission control metrics (queue depth, rejections) per route"""
+    return jsonify({
+        "routes": {
+            name: controller.snapshot()
+            for name, controller in _admission_controllers.items()
+        },
+        "timestamp": datetime.now().isoformat()
+    })
+
 if __name__ == "__main__":
     print("\n" + "="*80)
     print("[FLASK] FLASK API SERVER STARTING")
@@ -325,12 +688,15 @@ if __name__ == "__main__":
     print(f"[COMPANIES] Available companies: {', '.join(COMPANIES.keys())}")
     print("\n[ENDPOINTS] Available endpoints:")
     print("  GET /api/health           - Health check")
+    print("  GET /api/ready            - Readiness probe")
     print("  GET /api/companies        - Get list of companies")
     print("  GET /api/data             - Get filtered data")
     print("  GET /api/statistics       - Get statistics")
     print("  GET /api/date-range       - Get available date range")
     print("  GET /api/timeline         - Get timeline data")
+    print("  GET /api/query            - Filtered group-by aggregation")
+    print("  GET /api/metrics          - Admission control metrics")
     print(f"\n[SERVER] Server running on http://localhost:5000")
     print("="*80 + "\n")
     
-    app.run(debug=False, host="0.0.0.0", port=5000, use_reloader=False)
+    app.run(debug=False, host="0.0.0.0", port=5000, use_reloader=False, threaded=True)
@@ -0,0 +1,4 @@
+"""
+NLP stages for the employee sentiment pipeline.
+Each stage module can still be run as a standalone script.
+"""
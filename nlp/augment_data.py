@@ -6,8 +6,6 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 input_path = os.path.join(BASE_DIR, "data", "microsoft_employee_raw.csv")
 output_path = os.path.join(BASE_DIR, "data", "microsoft_employee_augmented.csv")
 
-df = pd.read_csv(input_path)
-
 # Paraphrasing templates
 prefixes = [
     "In my experience,", "Honestly,", "From what I see,",
@@ -19,31 +17,38 @@ suffixes = [
     "based on my experience.", "these days."
 ]
 
-augmented_rows = []
-
-for _, row in df.iterrows():
-    text = row["text"]
-    date = row["createdAt"]
+def augment(df, variants=8):
+    """Original rows plus `variants` prefix/suffix paraphrases of each"""
+    augmented_rows = []
 
-    # Add original
-    augmented_rows.append({
-        "text": text,
-        "createdAt": date
-    })
-
-    # Generate synthetic samples
-    for _ in range(8):  # 8 new per row
-        new_text = f"{random.choice(prefixes)} {text} {random.choice(suffixes)}"
+    for _, row in df.iterrows():
+        text = row["text"]
+        date = row["createdAt"]
 
+        # Add original
         augmented_rows.append({
-            "text": new_text,
+            "text": text,
             "createdAt": date
         })
 
-aug_df = pd.DataFrame(augmented_rows)
+        # Generate synthetic samples
+        for _ in range(variants):  # 8 new per row
+            new_text = f"{random.choice(prefixes)} {text} {random.choice(suffixes)}"
+
+            augmented_rows.append({
+                "text": new_text,
+                "createdAt": date
+            })
+
+    return pd.DataFrame(augmented_rows)
+
+if __name__ == "__main__":
+    df = pd.read_csv(input_path)
+
+    aug_df = augment(df)
 
-aug_df.to_csv(output_path, index=False)
+    aug_df.to_csv(output_path, index=False)
 
-print("Original size:", len(df))
-print("Augmented size:", len(aug_df))
-print("Saved to:", output_path)
+    print("Original size:", len(df))
+    print("Augmented size:", len(aug_df))
+    print("Saved to:", output_path)
@@ -0,0 +1,295 @@
+"""
+Micro-benchmarks for the NLP stages on synthetic corpora.
+
+Corpora are generated from the review templates in multi_company_scraper.py
+and the paraphrase prefixes/suffixes in nlp/augment_data.py, mixed with
+employee phrases, mentions, hashtags and URLs so every stage has realistic
+work to do. Each benchmark is timed at several corpus sizes; results,
+throughput and a log-log scaling exponent are written as JSON and can be
+compared against a stored baseline.
+
+Usage:
+    python nlp/benchmark.py --sizes 1000,10000,100000
+    python nlp/benchmark.py --save-baseline
+    python nlp/benchmark.py --compare
+"""
+
+import json
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from multi_company_scraper import (
+    COMPANIES_CONFIG,
+    NEGATIVE_REVIEWS,
+    NEUTRAL_REVIEWS,
+    POSITIVE_REVIEWS,
+)
+from nlp import augment_data, drift_detection, employee_filter, preprocess, sentiment
+
+BENCHMARK_DIR = os.path.join(BASE_DIR, "benchmarks")
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baseline.json")
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+MAX_SIZE = 1_000_000
+
+# Extra fragments so the filter and cleaner see realistic variety
+EMPLOYEE_PHRASES = [
+    "my manager", "my team", "the layoffs", "career growth", "salary",
+    "work life balance", "burnout", "promotion cycle", "hr", "as an employee",
+]
+NOISE = ["", "", "", " #worklife", " @hrteam", " https://example.com/post", " 🙂", " !!!"]
+
+
+# ===============================
+# Corpus generation
+# ===============================
+def generate_corpus(size, seed=42):
+    """Synthetic raw corpus with text, createdAt and sentiment columns"""
+    rng = random.Random(seed)
+    companies = [config["name"] for config in COMPANIES_CONFIG.values()]
+    pools = [
+        ("Positive", POSITIVE_REVIEWS),
+        ("Neutral", NEUTRAL_REVIEWS),
+        ("Negative", NEGATIVE_REVIEWS),
+    ]
+    base_date = datetime(2024, 1, 1)
+
+    texts, dates, labels = [], [], []
+    for _ in range(size):
+        label, pool = rng.choice(pools)
+        review = rng.choice(pool)
+        text = (
+            f"{rng.choice(augment_data.prefixes)} {review} at {rng.choice(companies)}"
+            f", {rng.choice(EMPLOYEE_PHRASES)} {rng.choice(augment_data.suffixes)}"
+            f"{rng.choice(NOISE)}"
+        )
+        texts.append(text)
+        dates.append((base_date + timedelta(days=rng.randint(0, 365))).date().isoformat())
+        labels.append(label)
+
+    return pd.DataFrame({"text": texts, "createdAt": dates, "sentiment": labels})
+
+
+# ===============================
+# Benchmarks
+# ===============================
+# Each benchmark maps a corpus to a zero-argument callable doing the timed
+# work. Setup (e.g. building the input column) happens outside the timing.
+def _per_row(func, column="text"):
+    def setup(corpus):
+        values = corpus[column].tolist()
+        return lambda: [func(value) for value in values]
+    return setup
+
+
+def _column(func, column="text"):
+    def setup(corpus):
+        values = corpus[column].tolist()
+        return lambda: func(values)
+    return setup
+
+
+def _stage(func, prepare=None):
+    def setup(corpus):
+        frame = prepare(corpus) if prepare else corpus
+        return lambda: func(frame)
+    return setup
+
+
+def _with_clean_text(corpus):
+    frame = corpus.copy()
+    frame["clean_text"] = frame["text"].str.lower()
+    return frame
+
+
+def _drift_updates(corpus):
+    values = np.random.default_rng(0).normal(0.3, 0.1, len(corpus)).tolist()
+
+    def run():
+        detector = drift_detection.SimpleDriftDetector()
+        for value in values:
+            detector.update(value)
+    return run
+
+
+BENCHMARKS = {
+    # Per-call functions
+    "is_employee_tweet": _per_row(employee_filter.is_employee_tweet),
+    "clean_text": _per_row(preprocess.clean_text),
+    "clean_column": _column(preprocess.clean_column),
+    "get_sentiment": _per_row(sentiment.get_sentiment),
+    "score_texts": _column(sentiment.score_texts),
+    "SimpleDriftDetector.update": _drift_updates,
+    # Whole stages
+    "stage.employee_filter": _stage(employee_filter.filter_employee_tweets),
+    "stage.employee_filter.all_companies": _stage(employee_filter.route_by_company),
+    "stage.preprocess": _stage(preprocess.clean_dataframe),
+    "stage.preprocess.rowwise": _stage(partial(preprocess.clean_dataframe, mode="rowwise")),
+    "stage.preprocess.vectorized": _stage(partial(preprocess.clean_dataframe, mode="vectorized")),
+    "stage.preprocess.parallel": _stage(partial(preprocess.clean_dataframe, workers=None)),
+    "stage.sentiment": _stage(partial(sentiment.score_dataframe, cache=None), prepare=_with_clean_text),
+    "stage.sentiment.parallel": _stage(
+        partial(sentiment.score_dataframe, cache=None, workers=None), prepare=_with_clean_text
+    ),
+    "stage.drift_detection": _stage(drift_detection.run_drift_detection),
+}
+
+
+def time_callable(run, repeat):
+    """Best-of-`repeat` wall time in seconds"""
+    best = math.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def scaling_exponent(points):
+    """
+    Slope of log(time) against log(size): ~1.0 is linear scaling,
+    noticeably above 1 means the benchmark scales super-linearly.
+    """
+    points = [(size, seconds) for size, seconds in points if seconds > 0]
+    if len(points) < 2:
+        return None
+    sizes = np.log([size for size, _ in points])
+    times = np.log([seconds for _, seconds in points])
+    return round(float(np.polyfit(sizes, times, 1)[0]), 3)
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, names=None, repeat=3, seed=42):
+    """Run the selected benchmarks at every size; returns the result dict"""
+    names = names or list(BENCHMARKS)
+    results = {name: {} for name in names}
+
+    for size in sizes:
+        corpus = generate_corpus(size, seed=seed)
+        print(f"\n[BENCH] Corpus size {size:,}")
+        for name in names:
+            run = BENCHMARKS[name](corpus)
+            # Large corpora are slow enough that one timing is representative
+            seconds = time_callable(run, repeat if size <= 10_000 else 1)
+            results[name][str(size)] = {
+                "seconds": round(seconds, 6),
+                "rows_per_s": round(size / seconds, 1) if seconds > 0 else None,
+            }
+            print(f"  {name:<34} {seconds:>10.4f}s  {size / seconds:>14,.0f} rows/s")
+
+    return {
+        "generated_at": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "sizes": list(sizes),
+        "results": results,
+        "scaling": {
+            name: scaling_exponent(
+                [(int(size), r["seconds"]) for size, r in by_size.items()]
+            )
+            for name, by_size in results.items()
+        },
+    }
+
+
+def compare_to_baseline(report, baseline, tolerance=0.10):
+    """
+    Print throughput relative to the baseline for every benchmark/size
+    both runs share. Returns the list of regressions beyond `tolerance`.
+    """
+    regressions = []
+    print("\n[COMPARE] Benchmark                    Size       Baseline rows/s  Current rows/s   Change")
+    for name, by_size in report["results"].items():
+        for size, current in by_size.items():
+            previous = baseline.get("results", {}).get(name, {}).get(size)
+            if not previous or not previous.get("rows_per_s") or not current.get("rows_per_s"):
+                continue
+            change = current["rows_per_s"] / previous["rows_per_s"] - 1
+            flag = ""
+            if change < -tolerance:
+                flag = "  REGRESSION"
+                regressions.append({"benchmark": name, "size": size, "change": round(change, 4)})
+            print(
+                f"          {name:<34} {size:<10} {previous['rows_per_s']:>15,.0f} "
+                f"{current['rows_per_s']:>15,.0f}  {change:>+7.1%}{flag}"
+            )
+    return regressions
+
+
+def save_json(data, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the NLP stage functions")
+    parser.add_argument(
+        "--sizes",
+        default=",".join(map(str, DEFAULT_SIZES)),
+        help=f"comma-separated corpus sizes, up to {MAX_SIZE:,} (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--only",
+        default=None,
+        help="comma-separated benchmark names (default: all): " + ", ".join(BENCHMARKS),
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="timings per small corpus (best is kept)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="result JSON path (default: benchmarks/<timestamp>.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--compare", action="store_true", help="compare this run against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="throughput drop flagged as regression")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    if any(size > MAX_SIZE for size in sizes):
+        parser.error(f"corpus sizes are limited to {MAX_SIZE:,} rows")
+    names = args.only.split(",") if args.only else None
+    unknown = [name for name in names or [] if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    report = run_benchmarks(sizes, names=names, repeat=args.repeat, seed=args.seed)
+
+    print("\n[SCALING] log-log slope (1.0 = linear)")
+    for name, slope in report["scaling"].items():
+        print(f"  {name:<34} {slope if slope is not None else '-'}")
+
+    output = args.output or os.path.join(
+        BENCHMARK_DIR, f"benchmark_{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    save_json(report, output)
+    print(f"\n[SAVED] Results: {output}")
+
+    # Exit status for automated checks: 1 on regressions, 2 if --compare
+    # had no baseline to compare against (unless this run saves one)
+    exit_code = 0
+    if args.compare:
+        if not os.path.exists(BASELINE_PATH):
+            print(f"[WARNING] No baseline at {BASELINE_PATH}; run with --save-baseline first")
+            if not args.save_baseline:
+                exit_code = 2
+        else:
+            with open(BASELINE_PATH, "r", encoding="utf-8") as f:
+                regressions = compare_to_baseline(report, json.load(f), args.tolerance)
+            if regressions:
+                print(f"\n[REGRESSION] {len(regressions)} benchmark(s) slower than baseline")
+                exit_code = 1
+
+    if args.save_baseline:
+        save_json(report, BASELINE_PATH)
+        print(f"[SAVED] Baseline: {BASELINE_PATH}")
+    sys.exit(exit_code)
@@ -0,0 +1,89 @@
+"""
+Per-chunk checkpoints for streaming pipeline runs.
+
+After every chunk has been appended to the .partial stage outputs, a small
+manifest in .pipeline_state/ records the index of the next chunk, the raw
+file byte offset it starts at, the byte size of each partial file and the
+running aggregates (sentiment counts, weekly drift stats). A restarted run
+over the same raw file, chunk size, outputs and code truncates the partial
+files back to the recorded sizes, which drops any half-written chunk, and
+seeks straight to the next chunk's raw bytes, so resuming late in a large
+file costs no more than the chunks left. The final outputs are identical
+to those of an uninterrupted run.
+"""
+
+import os
+
+from nlp import incremental, stage_cache
+
+
+def manifest_name(company):
+    return f"{company}_stream"
+
+
+def run_fingerprint(raw_path, chunksize, outputs, modules):
+    """What a manifest must match to be resumed from"""
+    stat = os.stat(raw_path)
+    return {
+        "raw": os.path.abspath(raw_path),
+        "raw_size": stat.st_size,
+        "raw_mtime_ns": stat.st_mtime_ns,
+        "chunksize": chunksize,
+        "outputs": sorted(outputs),
+        "code": stage_cache.code_version(modules),
+    }
+
+
+def _offsets(partial_paths):
+    return {
+        stage: os.path.getsize(path) if os.path.exists(path) else None
+        for stage, path in partial_paths.items()
+    }
+
+
+def resume_point(company, fingerprint, partial_paths):
+    """
+    Return the saved manifest if the run can be resumed, else None.
+    On resume every partial file is truncated to its committed size.
+    """
+    manifest = incremental.load_state(manifest_name(company))
+    if manifest is None or manifest.get("fingerprint") != fingerprint or "raw_offset" not in manifest:
+        return None
+
+    offsets = manifest.get("offsets", {})
+    for stage, path in partial_paths.items():
+        size = offsets.get(stage)
+        if size is not None and (not os.path.exists(path) or os.path.getsize(path) < size):
+            return None
+
+    for stage, path in partial_paths.items():
+        size = offsets.get(stage)
+        if size is None:
+            if os.path.exists(path):
+                os.remove(path)
+        else:
+            with open(path, "r+b") as f:
+                f.truncate(size)
+    return manifest
+
+
+def commit_chunk(company, fingerprint, next_chunk, raw_offset, partial_paths, progress):
+    """
+    Record that every chunk before `next_chunk` is safely on disk and that
+    the next one starts at byte `raw_offset` of the raw file.
+    `progress` holds the JSON-serializable running aggregates.
+    """
+    incremental.save_state(manifest_name(company), {
+        "fingerprint": fingerprint,
+        "next_chunk": next_chunk,
+        "raw_offset": raw_offset,
+        "offsets": _offsets(partial_paths),
+        "progress": progress,
+    })
+
+
+def clear(company):
+    """Drop the manifest once the outputs have been published"""
+    path = incremental.state_path(manifest_name(company))
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,52 @@
+"""
+Per-company configuration for the NLP stages.
+
+Company ids come from multi_company_scraper.COMPANIES_CONFIG, the same
+companies the API serves. The employee filter keeps its own company
+context terms (nlp/employee_filter.py); the scraper's search keywords
+include generic product words that don't tie a text to a company.
+"""
+
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from multi_company_scraper import COMPANIES_CONFIG
+
+DATA_DIR = os.path.join(BASE_DIR, "data")
+DEFAULT_COMPANY = "microsoft"
+
+# Raw columns are read as strings so values pass through unchanged and
+# chunked reads cannot infer different dtypes than a whole-file read.
+RAW_CSV_OPTIONS = {"dtype": str}
+
+
+def company_list():
+    return list(COMPANIES_CONFIG.keys())
+
+
+def company_paths(company):
+    """
+    Input/output files for one company's pipeline run.
+    Raw data is read from data/ when present (as for Microsoft), otherwise
+    from the project root where import_real_data.py writes it.
+    """
+    if company not in COMPANIES_CONFIG:
+        raise ValueError(f"Unknown company: {company}")
+
+    raw_path = os.path.join(DATA_DIR, f"{company}_employee_raw.csv")
+    if not os.path.exists(raw_path):
+        root_raw_path = os.path.join(BASE_DIR, f"{company}_employee_raw.csv")
+        if os.path.exists(root_raw_path):
+            raw_path = root_raw_path
+
+    return {
+        "raw": raw_path,
+        "filtered": os.path.join(BASE_DIR, f"{company}_employee_filtered.csv"),
+        "clean": os.path.join(BASE_DIR, f"{company}_employee_clean.csv"),
+        "sentiment": os.path.join(BASE_DIR, f"{company}_employee_sentiment.csv"),
+        "tokens": os.path.join(BASE_DIR, f"{company}_employee_tokens"),
+    }
@@ -0,0 +1,48 @@
+"""
+Exact-duplicate collapsing for per-row text functions.
+
+Datasets repeat the same review text many times (templates, augmented
+variants, re-scraped posts). map_unique() runs an expensive per-text
+function once per distinct key and broadcasts the results back to every
+row with a vectorized take, so the work grows with the number of unique
+texts instead of the number of rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def normalized_text(text):
+    """
+    Case- and whitespace-insensitive key for clean_text(): it lowercases
+    first and splits on whitespace last, so texts with the same key clean
+    to the same result.
+    """
+    return " ".join(str(text).lower().split())
+
+
+def unique_codes(values, key=None):
+    """
+    (codes, uniques) of `values`, or of key(value) with `key`, so that
+    uniques.take(codes) rebuilds the keys. NaN is one more distinct value.
+    """
+    values = values if isinstance(values, pd.Series) else pd.Series(values)
+    keys = values.map(key) if key is not None else values
+    return pd.factorize(keys, use_na_sentinel=False)
+
+
+def map_unique(values, func, key=None):
+    """
+    Apply `func` to every value, computing it once per distinct key.
+    With `key`, rows are grouped by key(value) and `func` is applied to the
+    key itself, so it must give the same result for all values sharing a
+    key. NaN is treated as one more distinct value.
+    Returns (results array aligned with `values`, number of unique keys).
+    """
+    codes, uniques = unique_codes(values, key)
+
+    results = np.empty(len(uniques), dtype=object)
+    for i, unique in enumerate(uniques):
+        results[i] = func(unique)
+    return results.take(codes), len(uniques)
+
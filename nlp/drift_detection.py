@@ -1,5 +1,6 @@
 import pandas as pd
 import os
+import sys
 import numpy as np
 
 class SimpleDriftDetector:
@@ -38,26 +39,10 @@ class SimpleDriftDetector:
 # Paths
 # =====================================
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-input_path = os.path.join(BASE_DIR, "microsoft_employee_sentiment.csv")
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
 
-# =====================================
-# Load dataset
-# =====================================
-df = pd.read_csv(input_path)
-
-# -------------------------------------
-# Fix datetime warning explicitly
-# -------------------------------------
-# Use UTC to avoid mixed-format warning
-df["createdAt"] = pd.to_datetime(
-    df["createdAt"],
-    utc=True,
-    errors="coerce"
-)
-
-# Drop invalid dates and sort
-df = df.dropna(subset=["createdAt"])
-df = df.sort_values("createdAt")
+from nlp.companies import DEFAULT_COMPANY, company_paths
 
 # =====================================
 # Convert sentiment to numeric
@@ -67,38 +52,91 @@ sentiment_map = {
     "Neutral": 0,
     "Negative": -1
 }
-df["sentiment_score"] = df["sentiment"].map(sentiment_map)
 
-# =====================================
-# Weekly aggregation
-# =====================================
-weekly_sentiment = (
-    df
-    .resample("W", on="createdAt")["sentiment_score"]
-    .mean()
-    .dropna()
-)
+def weekly_sentiment_stats(df):
+    """
+    Weekly sum and count of sentiment scores from a scored DataFrame.
+    Sums/counts (rather than means) can be merged across batches, which is
+    what the incremental pipeline relies on.
+    """
+    df = df.copy()
 
-# =====================================
-# Drift Detection (Simple ADWIN-like)
-# =====================================
-adwin = SimpleDriftDetector()   # use delta=0.01 if you want higher sensitivity
-drift_weeks = []
+    # -------------------------------------
+    # Fix datetime warning explicitly
+    # -------------------------------------
+    # Use UTC to avoid mixed-format warning
+    df["createdAt"] = pd.to_datetime(
+        df["createdAt"],
+        utc=True,
+        errors="coerce"
+    )
 
-for date, score in weekly_sentiment.items():
-    adwin.update(score)
-    if adwin.drift_detected:
-        drift_weeks.append(date)
+    # Drop invalid dates and sort
+    df = df.dropna(subset=["createdAt"])
+    df = df.sort_values("createdAt")
 
-# =====================================
-# Output Results
-# =====================================
-print("\nWeekly Sentiment Drift Detection Results")
-print("---------------------------------------")
-
-if drift_weeks:
-    print("Drift detected on the following weeks:")
-    for d in drift_weeks:
-        print(d.date())
-else:
-    print("No significant weekly sentiment drift detected")
+    df["sentiment_score"] = df["sentiment"].map(sentiment_map)
+
+    # Weekly aggregation
+    weekly = (
+        df
+        .resample("W", on="createdAt")["sentiment_score"]
+        .agg(["sum", "count"])
+    )
+    return weekly[weekly["count"] > 0]
+
+def weekly_sentiment_series(df):
+    """Weekly mean sentiment score from a scored DataFrame"""
+    weekly = weekly_sentiment_stats(df)
+    return (weekly["sum"] / weekly["count"]).dropna()
+
+# Detector settings used by the pipeline
+DRIFT_SETTINGS = {
+    "window_size": 30,
+    "threshold": 0.1
+}
+
+def detect_drift(weekly_sentiment, window_size=DRIFT_SETTINGS["window_size"],
+                 threshold=DRIFT_SETTINGS["threshold"]):
+    """Run the drift detector over a weekly series; returns drift weeks"""
+    adwin = SimpleDriftDetector(window_size, threshold)   # use delta=0.01 if you want higher sensitivity
+    drift_weeks = []
+
+    for date, score in weekly_sentiment.items():
+        adwin.update(score)
+        if adwin.drift_detected:
+            drift_weeks.append(date)
+
+    return drift_weeks
+
+def run_drift_detection(df, **settings):
+    """Stage function: weekly aggregation + drift detection"""
+    return detect_drift(weekly_sentiment_series(df), **settings)
+
+def report_drift(drift_weeks):
+    print("\nWeekly Sentiment Drift Detection Results")
+    print("---------------------------------------")
+
+    if drift_weeks:
+        print("Drift detected on the following weeks:")
+        for d in drift_weeks:
+            print(d.date())
+    else:
+        print("No significant weekly sentiment drift detected")
+
+def main(company=DEFAULT_COMPANY):
+    # Load dataset
+    df = pd.read_csv(company_paths(company)["sentiment"])
+
+    # Drift Detection (Simple ADWIN-like)
+    drift_weeks = run_drift_detection(df)
+
+    # Output Results
+    report_drift(drift_weeks)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Weekly sentiment drift detection")
+    parser.add_argument("--company", default=DEFAULT_COMPANY, help="company id (default: microsoft)")
+    main(parser.parse_args().company)
@@ -1,27 +1,55 @@
+import io
+import numpy as np
 import pandas as pd
 import os
 import re
+import sys
+from bisect import bisect_right
+from functools import lru_cache, partial
+from itertools import accumulate
 
 # ===============================
 # Paths
 # ===============================
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-input_path = os.path.join(BASE_DIR, "data", "microsoft_employee_raw.csv")
-output_path = os.path.join(BASE_DIR, "microsoft_employee_filtered.csv")
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from nlp import parallel
+from nlp.companies import DEFAULT_COMPANY, RAW_CSV_OPTIONS, company_list, company_paths
 
 # ===============================
-# Load raw data
+# Company context (mandatory)
 # ===============================
-df = pd.read_csv(input_path)
-print("RAW DATA SIZE:", len(df))   # 🔍 DEBUG (IMPORTANT)
+# Matched as plain substrings, like the original "microsoft"/"msft" check
+# (so "#microsoftlife" and "microsoft365" count). Only names that tie a
+# text to the company: generic product or search words ("windows",
+# "search", "android", "prime") would pull in unrelated texts.
+company_context = {
+    "microsoft": ["microsoft", "msft"],
+    "google": ["google"],
+    "amazon": ["amazon"],
+    "meta": ["facebook"],
+}
+
+# Names that are also parts of ordinary words ("metadata", "pineapple",
+# "alphabetical") only count as whole words, in the forms below. Companies
+# listed in neither table fall back to their id as a whole word.
+company_context_words = {
+    "google": ["alphabet"],
+    "apple": ["apple"],
+    "meta": ["meta"],
+}
+CONTEXT_WORD_FORMS = ("", "s", "'s", "\u2019s")  # plural and possessive
 
 # ===============================
 # Employee-related keywords
 # ===============================
+# "{company}" is replaced with the company id (e.g. "former microsoft")
 employee_keywords = [
     "employee",
     "worked at", "working at", "work at",
-    "former microsoft", "fmr microsoft",
+    "former {company}", "fmr {company}",
     "layoff", "laid off", "layoffs",
     "manager", "management",
     "office culture", "work culture",
@@ -32,59 +60,351 @@ employee_keywords = [
 # Strong fallback signals
 strong_employee_signals = [
     "my team", "my manager", "my role",
-    "years at microsoft", "at microsoft for",
-    "joined microsoft", "left microsoft"
+    "years at {company}", "at {company} for",
+    "joined {company}", "left {company}"
 ]
 
 # ===============================
 # Helper functions
 # ===============================
-def keyword_match(text, keyword):
+@lru_cache(maxsize=None)
+def company_terms(company):
     """
-    Use word-boundary regex for single words
-    Use substring match for phrases
+    (context substrings, context words, employee keywords, fallback
+    signals) for a company; context words include their plural and
+    possessive forms
     """
-    if " " in keyword:
-        return keyword in text
-    else:
-        return re.search(rf"\b{keyword}\b", text) is not None
+    if company not in company_list():
+        raise ValueError(f"Unknown company: {company}")
+    words = company_context_words.get(company, [] if company in company_context else [company])
+    return (
+        tuple(company_context.get(company, [])),
+        tuple(word + form for word in words for form in CONTEXT_WORD_FORMS),
+        tuple(kw.format(company=company) for kw in employee_keywords),
+        tuple(signal.format(company=company) for signal in strong_employee_signals),
+    )
+
+
+def _alternation(keywords, substrings=()):
+    """
+    One regex matching any of `keywords` (single words on word boundaries,
+    phrases as substrings) or of `substrings`: single words are grouped
+    under one word-boundary pair, phrases and substrings are literal
+    alternatives.
+    """
+    words = sorted((kw for kw in keywords if " " not in kw), key=len, reverse=True)
+    literals = [kw for kw in keywords if " " in kw] + list(substrings)
+    parts = []
+    if words:
+        parts.append(r"\b(?:" + "|".join(map(re.escape, words)) + r")\b")
+    parts.extend(re.escape(literal) for literal in sorted(literals, key=len, reverse=True))
+    return "|".join(parts) or "(?!)"
+
+
+@lru_cache(maxsize=None)
+def company_matchers(company):
+    """Compiled (context, employee keywords + signals) patterns for a company"""
+    context_substrings, context_words, keywords, signals = company_terms(company)
+    return (
+        re.compile(_alternation(context_words, context_substrings)),
+        re.compile(_alternation(keywords, signals)),
+    )
 
 
-def is_employee_tweet(text):
+def is_employee_tweet(text, company=DEFAULT_COMPANY):
     if not isinstance(text, str):
         return False
 
     text = text.lower()
+    context, employee = company_matchers(company)
 
-    # Microsoft context (mandatory)
-    if not ("microsoft" in text or "msft" in text):
-        return False
+    # Company context (mandatory), then any keyword or fallback signal
+    return context.search(text) is not None and employee.search(text) is not None
 
-    # Keyword match
-    keyword_hit = any(
-        keyword_match(text, kw) for kw in employee_keywords
-    )
 
-    # Fallback signals
-    fallback_hit = any(
-        signal in text for signal in strong_employee_signals
-    )
+def matched_terms(text, company=DEFAULT_COMPANY):
+    """Context and employee terms found in `text` (for debugging the filter)"""
+    if not isinstance(text, str):
+        return [], []
 
-    return keyword_hit or fallback_hit
+    text = text.lower()
+    return [
+        # Lookahead finds the longest hit at every position, overlapping or not
+        list(dict.fromkeys(m.group(1) for m in re.finditer(f"(?=({pattern.pattern}))", text)))
+        for pattern in company_matchers(company)
+    ]
 
 
-# ===============================
-# Apply filtering
-# ===============================
-df_employee = df[df["text"].apply(is_employee_tweet)].copy()
+_WORD_BOUNDARY = re.compile(r"\b")
+
+
+def _trie_alternation(terms):
+    """
+    Alternation of literal `terms` factored into a prefix trie, so the
+    regex engine picks a branch per character instead of trying every
+    term in turn; the cost no longer grows with the number of terms.
+    Longer terms are preferred where one term is a prefix of another.
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}  # a term ends here
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
 
 # ===============================
-# Save filtered output
+# Stage function
 # ===============================
-df_employee.to_csv(output_path, index=False)
+def _text_mask(texts, company=DEFAULT_COMPANY):
+    return texts.apply(is_employee_tweet, company=company).to_numpy(dtype=bool)
+
+
+def filter_employee_tweets(df, company=DEFAULT_COMPANY, workers=1,
+                           chunksize=parallel.DEFAULT_CHUNKSIZE):
+    """
+    Keep only rows whose text reads as employee feedback about `company`.
+    With `workers` > 1 (None = one per CPU), chunks of the text column are
+    matched in a process pool; only texts go out and boolean masks come
+    back, concatenated in the original row order.
+    """
+    if workers == 1:
+        mask = _text_mask(df["text"], company=company)
+    else:
+        masks = parallel.map_chunks(
+            partial(_text_mask, company=company),
+            df["text"],
+            workers=workers,
+            chunksize=chunksize,
+            initializer=init_worker,
+            initargs=(company,),
+        )
+        mask = np.concatenate(masks) if masks else np.zeros(0, dtype=bool)
+    return df[mask].copy()
+
+
+def _filter_range(byte_range, path, header, company=DEFAULT_COMPANY):
+    """Worker: parse one byte range of a raw CSV; returns (kept rows, rows read)"""
+    df = parallel.read_csv_range(path, header, *byte_range, **RAW_CSV_OPTIONS)
+    return df[_text_mask(df["text"], company=company)], len(df)
+
+
+def filter_employee_csv(path, company=DEFAULT_COMPANY, workers=None,
+                        chunk_bytes=parallel.DEFAULT_CHUNK_BYTES):
+    """
+    filter_employee_tweets() on a raw CSV file. With `workers` > 1 (None =
+    one per CPU) the file is split into byte ranges on row boundaries and
+    every worker reads, parses and filters its own ranges, so the parent
+    never parses the file; only the kept rows come back, indexed by their
+    row number in the file. df.attrs["raw_rows"] records the rows read.
+    """
+    if workers == 1:
+        df = pd.read_csv(path, **RAW_CSV_OPTIONS)
+        result = filter_employee_tweets(df, company=company)
+        result.attrs["raw_rows"] = len(df)
+        return result
+
+    header, ranges = parallel.csv_byte_ranges(path, chunk_bytes)
+    if not ranges:
+        result = pd.read_csv(io.BytesIO(header), **RAW_CSV_OPTIONS)
+        result.attrs["raw_rows"] = 0
+        return result
+    parts = parallel.map_items(
+        partial(_filter_range, path=path, header=header, company=company),
+        ranges,
+        workers=workers,
+        initializer=init_worker,
+        initargs=(company,),
+    )
+    raw_rows = 0
+    for kept, rows in parts:
+        kept.index += raw_rows
+        raw_rows += rows
+    result = pd.concat([kept for kept, _ in parts])
+    result.attrs["raw_rows"] = raw_rows
+    return result
+
+
+def init_worker(company=DEFAULT_COMPANY):
+    """Compile the company's matchers once per worker process"""
+    company_matchers(company)
+
 
 # ===============================
-# Debug output
+# Multi-company classification
 # ===============================
-print("Filtered tweets:", len(df_employee))
-print("Saved to:", output_path)
+SIGNALS_COLUMN = "employee_signals"
+
+
+@lru_cache(maxsize=None)
+def classification_matchers(companies):
+    """
+    Term classes for classify_companies(), one bit each: "employee" holds
+    the company-independent keywords and signals, ("context", c) and
+    ("employee", c) company c's context terms and templated
+    keywords/signals. Returns (class names, scan pattern, bits per term,
+    word-boundary terms, ambiguous terms, per-class patterns).
+    """
+    generic = [kw for kw in employee_keywords if "{company}" not in kw]
+    generic_signals = [sig for sig in strong_employee_signals if "{company}" not in sig]
+    classes = {"employee": (generic, generic_signals)}
+    for company in companies:
+        context_substrings, context_words = company_terms(company)[:2]
+        classes[("context", company)] = (context_words, context_substrings)
+        classes[("employee", company)] = (
+            [kw.format(company=company) for kw in employee_keywords if "{company}" in kw],
+            [sig.format(company=company) for sig in strong_employee_signals if "{company}" in sig],
+        )
+
+    term_bits, words, literals = {}, set(), set()
+    class_patterns = []
+    for bit, (keywords, substrings) in enumerate(classes.values()):
+        for term in keywords:
+            (literals if " " in term else words).add(term)
+            term_bits[term] = term_bits.get(term, 0) | (1 << bit)
+        for term in substrings:
+            literals.add(term)
+            term_bits[term] = term_bits.get(term, 0) | (1 << bit)
+        class_patterns.append((1 << bit, re.compile(_alternation(keywords, substrings))))
+
+    # Where one term is a prefix of another (or a term is both a word and a
+    # substring), a hit may hide other matches at the same position; those
+    # positions are re-checked against every class pattern.
+    ambiguous = (words & literals) | {
+        term for term in term_bits for other in term_bits
+        if other != term and (other.startswith(term) or term.startswith(other))
+    }
+    # One trie over every term; word boundaries are checked per hit
+    scan = re.compile(_trie_alternation(term_bits) or "(?!)")
+    return list(classes), scan, term_bits, frozenset(words), frozenset(ambiguous), class_patterns
+
+
+def classify_companies(texts, companies=None):
+    """
+    DataFrame with one boolean column per company (which companies each
+    text is employee feedback about, with is_employee_tweet() semantics)
+    and an "employee_signals" column listing the employee keywords and
+    signals found in each text, generic or templated for any company.
+    The column is scanned once for the terms of every company, so the scan
+    does not repeat per company as companies are added.
+    """
+    companies = tuple(companies or company_list())
+    result = pd.DataFrame(False, index=texts.index, columns=list(companies))
+    signals = [[] for _ in range(len(texts))]
+    result[SIGNALS_COLUMN] = pd.Series(signals, index=texts.index, dtype=object)
+    try:
+        lowered = texts.str.lower()
+    except AttributeError:  # no string values at all
+        return result
+
+    rows = np.flatnonzero(lowered.notna().to_numpy())
+    values = lowered.to_numpy()[rows]
+    ends = list(accumulate(len(text) + 1 for text in values))
+    joined = "\n".join(values)
+    names, scan, term_bits, words, ambiguous, class_patterns = classification_matchers(companies)
+    employee_bits = sum(1 << bit for bit, name in enumerate(names) if name == "employee" or name[0] == "employee")
+
+    bits = [0] * len(values)
+    pos = 0
+    search = scan.search
+    while True:
+        m = search(joined, pos)
+        if m is None:
+            break
+        start = m.start()
+        pos = start + 1  # terms may overlap
+        term = m.group()
+        if term in ambiguous:
+            found, terms = 0, []
+            for bit, pattern in class_patterns:
+                hit = pattern.match(joined, start)
+                if hit:
+                    found |= bit
+                    if bit & employee_bits:
+                        terms.append(hit.group())
+        elif term not in words or (
+            _WORD_BOUNDARY.match(joined, start) and _WORD_BOUNDARY.match(joined, m.end())
+        ):
+            found, terms = term_bits[term], [term]
+        else:
+            continue
+        if found:
+            row = bisect_right(ends, start)
+            bits[row] |= found
+            if found & employee_bits:
+                tags = signals[rows[row]]
+                tags.extend(t for t in terms if t not in tags)
+
+    bits = np.array(bits, dtype=object)
+    generic = 1 << names.index("employee")
+    for company in companies:
+        context = 1 << names.index(("context", company))
+        employee = generic | (1 << names.index(("employee", company)))
+        hit = ((bits & context) != 0) & ((bits & employee) != 0)
+        result.iloc[rows[hit.astype(bool)], companies.index(company)] = True
+    return result
+
+
+def route_by_company(df, companies=None):
+    """Split `df` into per-company employee-feedback frames in one scan"""
+    labels = classify_companies(df["text"], companies).drop(columns=SIGNALS_COLUMN)
+    return {company: df[labels[company].to_numpy()].copy() for company in labels.columns}
+
+
+def route_main(raw_path, companies=None):
+    """Classify a mixed raw CSV once and write every company's filtered output"""
+    df = pd.read_csv(raw_path, **RAW_CSV_OPTIONS)
+    print("RAW DATA SIZE:", len(df))
+
+    for company, df_employee in route_by_company(df, companies).items():
+        path = company_paths(company)["filtered"]
+        df_employee.to_csv(path, index=False)
+        print(f"{company}: {len(df_employee)} filtered tweets -> {path}")
+
+
+def main(company=DEFAULT_COMPANY, workers=1):
+    paths = company_paths(company)
+
+    # Load and filter raw data (workers read their own parts of the file)
+    df_employee = filter_employee_csv(paths["raw"], company=company, workers=workers)
+    print("RAW DATA SIZE:", df_employee.attrs["raw_rows"])   # 🔍 DEBUG (IMPORTANT)
+
+    # Save filtered output
+    df_employee.to_csv(paths["filtered"], index=False)
+
+    # Debug output
+    print("Filtered tweets:", len(df_employee))
+    print("Saved to:", paths["filtered"])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Filter raw texts down to employee feedback")
+    parser.add_argument("--company", default=DEFAULT_COMPANY, help="company id (default: microsoft)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="filter the raw file in this many processes, each reading its own byte "
+             "ranges (0 = one per CPU; default: 1)",
+    )
+    parser.add_argument(
+        "--route",
+        metavar="RAW_CSV",
+        help="classify a mixed raw CSV once and write the filtered output of every company",
+    )
+    args = parser.parse_args()
+    if args.route:
+        route_main(args.route)
+    else:
+        main(args.company, workers=args.workers or None)
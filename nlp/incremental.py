@@ -0,0 +1,252 @@
+"""
+Watermark state for the incremental pipeline mode.
+
+The raw CSV is treated as append-only: each run records the byte offset it
+has consumed up to plus a cheap fingerprint of that prefix (its first and
+last blocks). The next run seeks to the offset and parses only the bytes
+appended since, so a refresh costs O(new rows) however long the history
+is, and appends the results to the stage outputs. If the fingerprinted
+blocks changed, the raw file shrank, or an output file was modified since
+the last run, the pipeline falls back to a full rebuild. Edits in the
+middle of an unchanged-size prefix are not detected; use a full rebuild
+after rewriting raw history.
+
+Drift state is kept as per-week score sums and counts, so new rows only
+update the weeks they fall into.
+"""
+
+import hashlib
+import io
+import json
+import os
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATE_DIR = os.path.join(BASE_DIR, ".pipeline_state")
+
+
+def state_path(name):
+    return os.path.join(STATE_DIR, f"{name}.json")
+
+
+def load_state(name):
+    """Load the saved watermark state, or None if there is none"""
+    path = state_path(name)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_state(name, state):
+    """Atomically write the watermark state"""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    path = state_path(name)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+PREFIX_BLOCK = 64 * 1024  # bytes hashed at each end of the processed prefix
+
+
+def prefix_fingerprint(path, offset):
+    """Size plus hashes of the first and last PREFIX_BLOCK bytes of path[:offset]"""
+    with open(path, "rb") as f:
+        head = f.read(min(offset, PREFIX_BLOCK))
+        f.seek(max(offset - PREFIX_BLOCK, 0))
+        tail = f.read(offset - f.tell())
+    return {
+        "offset": offset,
+        "head": hashlib.sha256(head).hexdigest(),
+        "tail": hashlib.sha256(tail).hexdigest(),
+    }
+
+
+def read_csv_from(path, offset=None, **csv_options):
+    """
+    Parse the CSV rows stored after byte `offset` (all rows if None), with
+    the file's header line. Returns (DataFrame, end offset); only the new
+    bytes are read.
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        start = max(offset or 0, len(header))
+        f.seek(start)
+        data = f.read()
+    return pd.read_csv(io.BytesIO(header + data), **csv_options), start + len(data)
+
+
+def iter_csv_chunks(path, chunksize, offset=None, **csv_options):
+    """
+    Parse a CSV in chunks of `chunksize` rows starting at byte `offset` (a
+    row boundary; the first row if None). Yields (DataFrame, end offset),
+    so a caller can record where to continue. Rows are counted by scanning
+    lines: a line ends a row unless it leaves a quoted field open.
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        f.seek(max(offset or 0, len(header)))
+        while True:
+            lines, rows, quoted = [], 0, False
+            while rows < chunksize:
+                line = f.readline()
+                if not line:
+                    break
+                lines.append(line)
+                if line.count(b'"') % 2:
+                    quoted = not quoted
+                if not quoted:
+                    rows += 1
+            if not lines:
+                return
+            yield pd.read_csv(io.BytesIO(header + b"".join(lines)), **csv_options), f.tell()
+
+
+def output_signature(paths):
+    """File sizes of the stage outputs, used to detect outside edits"""
+    return {
+        stage: os.path.getsize(path) if os.path.exists(path) else None
+        for stage, path in paths.items()
+    }
+
+
+def plan_delta(state, raw_path, output_paths):
+    """
+    Decide where processing should start.
+    Returns (byte offset, reason); offset None means a full rebuild.
+    """
+    if state is None:
+        return None, "no previous state"
+
+    fingerprint = state.get("raw_fingerprint")
+    if fingerprint is None:
+        return None, "no byte watermark in saved state"
+    offset = fingerprint["offset"]
+    if os.path.getsize(raw_path) < offset:
+        return None, "raw file shrank"
+    if prefix_fingerprint(raw_path, offset) != fingerprint:
+        return None, "previously processed rows changed"
+    if output_signature(output_paths) != state.get("outputs"):
+        return None, "stage outputs changed since last run"
+
+    return offset, "incremental"
+
+
+def append_csv(df, path):
+    """Append rows to a CSV, writing the header only for a new file"""
+    df.to_csv(path, mode="a", header=not os.path.exists(path), index=False)
+
+
+COMMIT_SUFFIX = ".committed"  # pointer holding the published length of a CSV
+
+
+def _read_commit(path):
+    """Committed size of a published CSV, or None if there is no valid pointer"""
+    try:
+        with open(path + COMMIT_SUFFIX, "r", encoding="utf-8") as f:
+            commit = json.load(f)
+        stat = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    # A pointer left behind by a file that has since been replaced is stale
+    if commit.get("inode") != stat.st_ino or commit.get("size", 0) > stat.st_size:
+        return None
+    return commit["size"]
+
+
+def _write_commit(path, size):
+    tmp_path = f"{path}{COMMIT_SUFFIX}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"size": size, "inode": os.stat(path).st_ino}, f)
+    os.replace(tmp_path, path + COMMIT_SUFFIX)
+
+
+def publish_csv(df, path, append=False):
+    """
+    Write (or append to) a published CSV without exposing partial rows.
+
+    A full write is built in a temporary file and swapped in with
+    os.replace. An append writes only the new rows at the end of the
+    existing file (after truncating anything an interrupted append left
+    past the committed length), fsyncs, and then atomically moves the
+    `.committed` pointer to the new length, so the cost is O(new rows).
+    Readers use read_published_csv(), which stops at the committed length.
+    """
+    if append and os.path.exists(path):
+        committed = _read_commit(path)
+        with open(path, "r+b") as f:
+            if committed is not None:
+                f.truncate(committed)
+            f.seek(0, os.SEEK_END)
+            f.write(df.to_csv(header=False, index=False).encode("utf-8"))
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+    else:
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        df.to_csv(tmp_path, index=False)
+        publish_file(tmp_path, path)
+        return
+    _write_commit(path, size)
+
+
+def publish_file(src_path, path):
+    """
+    Publish a finished CSV built elsewhere (e.g. a streaming run's
+    .partial file): swap it in with os.replace and point the `.committed`
+    pointer at its full length, replacing the old file's pointer.
+    """
+    os.replace(src_path, path)
+    _write_commit(path, os.path.getsize(path))
+
+
+def published_signature(path):
+    """
+    (mtime_ns, size) of what is published at `path`: those of the commit
+    pointer if there is one, else of the file. Stable while an append is
+    being written, changed once it is committed.
+    """
+    committed = _read_commit(path)
+    stat = os.stat(path if committed is None else path + COMMIT_SUFFIX)
+    return stat.st_mtime_ns, stat.st_size if committed is None else committed
+
+
+def read_published_csv(path, **csv_options):
+    """Read the committed rows of a published CSV, ignoring an append in progress"""
+    committed = _read_commit(path)
+    if committed is None:
+        return pd.read_csv(path, **csv_options)
+    with open(path, "rb") as f:
+        data = f.read(committed)
+    return pd.read_csv(io.BytesIO(data), **csv_options)
+
+
+def merge_weekly_stats(previous, weekly):
+    """
+    Merge new weekly sum/count stats into the saved ones.
+    `previous` maps ISO week timestamps to [sum, count].
+    """
+    merged = dict(previous or {})
+    for week, row in weekly.iterrows():
+        key = week.isoformat()
+        total, count = merged.get(key, [0.0, 0])
+        merged[key] = [total + float(row["sum"]), count + int(row["count"])]
+    return merged
+
+
+def weekly_series(weekly_stats):
+    """Weekly mean sentiment series from merged sum/count stats"""
+    if not weekly_stats:
+        return pd.Series(dtype=float)
+    series = pd.Series({
+        pd.Timestamp(week): total / count
+        for week, (total, count) in weekly_stats.items()
+        if count > 0
+    })
+    return series.sort_index()
@@ -0,0 +1,105 @@
+"""
+Persistent LRU cache of word lemmas.
+
+The cleaning vocabulary is small and repeats constantly, so after the first
+occurrence of a word lemmatizing is a dictionary lookup. The table is saved
+to .pipeline_cache/lemmas.json and loaded by the next run, which then only
+consults the lemmatizer (WordNet) for words it has never seen.
+"""
+
+import json
+import os
+from collections import OrderedDict
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_PATH = os.path.join(BASE_DIR, ".pipeline_cache", "lemmas.json")
+DEFAULT_MAXSIZE = 200_000
+
+
+class LemmaCache:
+    """
+    word -> lemma, least recently used entries evicted beyond `maxsize`.
+    `lemmatize_word` computes a missing lemma; `version` identifies the
+    lemmatizer so a table saved by a different one is ignored. With
+    `track_new` set (in worker processes), lemmas computed are also kept
+    for pop_new() until collected.
+    """
+
+    def __init__(self, lemmatize_word, path=CACHE_PATH, maxsize=DEFAULT_MAXSIZE, version=""):
+        self._lemmatize_word = lemmatize_word
+        self.path = path
+        self.maxsize = maxsize
+        self.version = version
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self.track_new = False
+        self._new = {}
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lemmatize(self, word):
+        entries = self._entries
+        lemma = entries.get(word)
+        if lemma is not None:
+            entries.move_to_end(word)
+            self.hits += 1
+            return lemma
+
+        self.misses += 1
+        lemma = self._lemmatize_word(word)
+        self._add(word, lemma)
+        if self.track_new:
+            self._new[word] = lemma
+        return lemma
+
+    def _add(self, word, lemma):
+        entries = self._entries
+        entries[word] = lemma
+        entries.move_to_end(word)
+        if len(entries) > self.maxsize:
+            entries.popitem(last=False)
+        self._dirty = True
+
+    def pop_new(self):
+        """Lemmas computed since the last call while tracking (e.g. to send back from a worker process)"""
+        new, self._new = self._new, {}
+        return new
+
+    def update(self, lemmas):
+        """Add lemmas computed elsewhere (e.g. returned by worker processes)"""
+        for word, lemma in lemmas.items():
+            if self._entries.get(word) != lemma:
+                self._add(word, lemma)
+
+    def load(self):
+        """Warm the cache from disk; returns the number of entries loaded"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if saved.get("version") != self.version:
+            return 0
+
+        # Saved least recently used first, so the newest entries survive a smaller maxsize
+        for word, lemma in saved.get("lemmas", [])[-self.maxsize:]:
+            self._entries.setdefault(word, lemma)
+        return len(self._entries)
+
+    def save(self):
+        """Atomically write the table if it gained entries; returns True if written"""
+        if not self._dirty:
+            return False
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "lemmas": list(self._entries.items())}, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        return True
+
+    def stats(self):
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,237 @@
+"""
+Near-duplicate clustering with MinHash signatures and LSH banding.
+
+Each text is reduced to a set of word n-gram shingles and a MinHash
+signature; the fraction of equal signature slots estimates the Jaccard
+similarity of two shingle sets. Signatures are cut into bands and texts
+that agree on a whole band land in the same bucket. Bands are processed
+one at a time: each bucket member is verified against the few members
+next to it (sorted so texts sharing the next band are adjacent), and
+pairs whose estimated similarity reaches the threshold merge their
+clusters. The fan-out per member is bounded, so the work is linear in
+the number of texts however large a bucket gets; pairs missed in one
+band meet again in another or are joined through a chain.
+
+The pipeline runs the clean and score stages on one representative row
+per cluster (map_representatives) and broadcasts their results.
+"""
+
+import os
+import re
+import sys
+import zlib
+
+import numpy as np
+import pandas as pd
+
+# ===============================
+# Paths
+# ===============================
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from nlp.companies import DEFAULT_COMPANY, company_paths
+
+# ===============================
+# Settings
+# ===============================
+DEFAULT_THRESHOLD = 0.7   # estimated Jaccard similarity of word-bigram sets
+NUM_PERM = 128            # signature length
+SHINGLE_SIZE = 2          # words per shingle
+SEED = 1
+BUCKET_FANOUT = 8         # members each bucket member is verified against
+
+_EMPTY = np.uint64(1 << 32)    # slot value of texts without shingles (hashes are < 2**32)
+_BATCH_SHINGLES = 50_000       # shingles hashed per numpy batch (x NUM_PERM uint64s)
+_TOKEN = re.compile(r"\w+")
+
+
+# ===============================
+# MinHash
+# ===============================
+def shingles(text, size=SHINGLE_SIZE):
+    """Hashed word n-grams of a text (lowercased, punctuation ignored)"""
+    words = _TOKEN.findall(text.lower()) if isinstance(text, str) else []
+    if len(words) <= size:
+        grams = [" ".join(words)] if words else []
+    else:
+        grams = [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+    return {zlib.crc32(gram.encode("utf-8")) for gram in grams}
+
+
+def minhash_signatures(texts, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, seed=SEED):
+    """
+    (len(texts), num_perm) uint64 signatures, hashed in batches with the
+    multiply-shift hashes ((a * x + b) mod 2**64) >> 32 (no modulo needed;
+    uint64 arithmetic wraps). Texts without any shingle keep a sentinel
+    value above every hash in every slot.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    b = rng.integers(0, 1 << 63, num_perm, dtype=np.uint64)
+    shift = np.uint64(32)
+
+    sets = [np.fromiter(shingles(text, shingle_size), dtype=np.uint64) for text in texts]
+    signatures = np.full((len(sets), num_perm), _EMPTY, dtype=np.uint64)
+
+    start = 0
+    while start < len(sets):
+        stop, total = start, 0
+        while stop < len(sets) and (total == 0 or total + len(sets[stop]) <= _BATCH_SHINGLES):
+            total += len(sets[stop])
+            stop += 1
+        rows = [i for i in range(start, stop) if len(sets[i])]
+        if rows:
+            values = np.concatenate([sets[i] for i in rows])
+            offsets = np.cumsum([0] + [len(sets[i]) for i in rows[:-1]])
+            with np.errstate(over="ignore"):
+                hashed = (np.outer(values, a) + b) >> shift
+            signatures[rows] = np.minimum.reduceat(hashed, offsets, axis=0)
+        start = stop
+    return signatures
+
+
+# ===============================
+# LSH banding & clustering
+# ===============================
+def lsh_bands(threshold, num_perm=NUM_PERM):
+    """
+    (bands, rows) with bands * rows == num_perm. Picks the split whose
+    S-curve midpoint (1/bands) ** (1/rows) is the highest one not above
+    `threshold`, so pairs at the threshold are very likely to be candidates
+    (candidates are verified against the threshold afterwards).
+    """
+    options = [(bands, num_perm // bands) for bands in range(1, num_perm + 1) if num_perm % bands == 0]
+    below = [opt for opt in options if (1 / opt[0]) ** (1 / opt[1]) <= threshold]
+    return max(below or options[-1:], key=lambda opt: (1 / opt[0]) ** (1 / opt[1]))
+
+
+def _band_keys(band):
+    """One uint64 key per row of a signature band (collisions only add candidates)"""
+    keys = np.zeros(len(band), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for column in band.T:
+            keys = keys * np.uint64(1_000_003) + column
+    return keys
+
+
+def cluster_ids(texts, threshold=DEFAULT_THRESHOLD, num_perm=NUM_PERM,
+                shingle_size=SHINGLE_SIZE, seed=SEED):
+    """
+    Cluster id per text (numbered in order of first appearance); texts
+    whose estimated similarity reaches `threshold` share a cluster,
+    directly or through a chain of such texts.
+    """
+    signatures = minhash_signatures(texts, num_perm, shingle_size, seed)
+    n = len(signatures)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    has_shingles = np.flatnonzero(signatures[:, 0] != _EMPTY)
+    bands, rows = lsh_bands(threshold, num_perm)
+
+    # root[i] is the representative (lowest index) of text i's cluster so
+    # far. Identical signatures are similar at 1.0: every copy starts out
+    # in its first occurrence's cluster and only distinct ones are banded
+    root = np.arange(n)
+    _, first, copy_of = np.unique(signatures[has_shingles], axis=0, return_index=True, return_inverse=True)
+    root[has_shingles] = has_shingles[first[copy_of.ravel()]]
+    distinct = has_shingles[np.sort(first)]
+
+    def band_codes(band):
+        return pd.factorize(_band_keys(signatures[distinct, band * rows:(band + 1) * rows]))[0]
+
+    codes = band_codes(0)
+    for band in range(bands):
+        next_codes = band_codes((band + 1) % bands) if bands > 1 else codes
+        # Within a bucket, texts that also share the next band sit together
+        order = np.lexsort((next_codes, codes))
+        bucket, members = codes[order], distinct[order]
+
+        # Verify each member against the BUCKET_FANOUT members before it,
+        # skipping pairs already in the same cluster
+        left, right = [], []
+        for k in range(1, BUCKET_FANOUT + 1):
+            same = bucket[k:] == bucket[:-k]
+            if not same.any():
+                break
+            i, j = members[:-k][same], members[k:][same]
+            fresh = root[i] != root[j]
+            i, j = i[fresh], j[fresh]
+            similar = (signatures[i] == signatures[j]).mean(axis=1) >= threshold
+            left.append(i[similar])
+            right.append(j[similar])
+        if left:
+            root = _merge(root, np.concatenate(left), np.concatenate(right))
+        codes = next_codes
+
+    return pd.factorize(root)[0]
+
+
+def _merge(root, i, j):
+    """Union of the clusters of every (i, j) pair; returns the new root array"""
+    # Imported here so runs without near-duplicate clustering don't need scipy
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+
+    n = len(root)
+    graph = coo_matrix((np.ones(len(i), dtype=np.int8), (root[i], root[j])), shape=(n, n))
+    _, labels = connected_components(graph, directed=False)
+    lowest = np.full(labels.max() + 1, n)
+    np.minimum.at(lowest, labels, np.arange(n))
+    return lowest[labels[root]]
+
+
+# ===============================
+# Stage function
+# ===============================
+def cluster_near_duplicates(df, threshold=DEFAULT_THRESHOLD, column="text"):
+    """Add a `cluster_id` column grouping near-duplicate texts"""
+    df = df.copy()
+    df["cluster_id"] = cluster_ids(df[column].tolist(), threshold=threshold)
+    return df
+
+
+def map_representatives(func, df, columns, cluster_column="cluster_id"):
+    """
+    Run stage `func` on the first row of every cluster only and broadcast
+    the new `columns` it adds to the other rows of the cluster.
+    df.attrs["unique_rows"] records the rows `func` actually processed.
+    """
+    clusters = df[cluster_column]
+    representatives = func(df[~clusters.duplicated().to_numpy()])
+    positions = pd.Index(representatives[cluster_column]).get_indexer(clusters)
+
+    df = df.copy()
+    for column in columns:
+        df[column] = representatives[column].to_numpy().take(positions)
+    df.attrs["unique_rows"] = representatives.attrs.get("unique_rows", len(representatives))
+    return df
+
+
+def main(company=DEFAULT_COMPANY, threshold=DEFAULT_THRESHOLD):
+    paths = company_paths(company)
+
+    df = pd.read_csv(paths["filtered"])
+    df = cluster_near_duplicates(df, threshold=threshold)
+    df.to_csv(paths["filtered"], index=False)
+
+    clusters = df["cluster_id"].nunique()
+    print(f"Texts: {len(df)}  clusters: {clusters}  "
+          f"(near-duplicate ratio {1 - clusters / max(len(df), 1):.1%})")
+    print("Saved to:", paths["filtered"])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cluster near-duplicate texts with MinHash-LSH")
+    parser.add_argument("--company", default=DEFAULT_COMPANY, help="company id (default: microsoft)")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"estimated Jaccard similarity for near-duplicates (default: {DEFAULT_THRESHOLD})",
+    )
+    args = parser.parse_args()
+    main(args.company, threshold=args.threshold)
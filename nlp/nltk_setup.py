@@ -0,0 +1,111 @@
+"""
+NLTK resources for preprocessing, resolved without network access.
+
+Importing the NLP stages never downloads anything: stopwords come from the
+local NLTK data directories, falling back to the English list packaged
+below (identical to NLTK's), and WordNet is only opened on the first lemma
+the persisted lemma table doesn't already have.
+
+Fetch the corpora once per machine (or into a shared NLTK_DATA directory
+for offline workers) with:
+
+    python nlp/nltk_setup.py [--download-dir DIR]
+"""
+
+import sys
+
+import nltk
+
+# name -> path checked by nltk.data.find()
+RESOURCES = {
+    "stopwords": "corpora/stopwords",
+    "wordnet": "corpora/wordnet",
+}
+
+# NLTK's English stopword list
+FALLBACK_STOP_WORDS = frozenset("""
+i me my myself we our ours ourselves you you're you've you'll you'd your
+yours yourself yourselves he him his himself she she's her hers herself it
+it's its itself they them their theirs themselves what which who whom this
+that that'll these those am is are was were be been being have has had
+having do does did doing a an the and but if or because as until while of
+at by for with about against between into through during before after above
+below to from up down in out on off over under again further then once here
+there when where why how all any both each few more most other some such no
+nor not only own same so than too very s t can will just don don't should
+should've now d ll m o re ve y ain aren aren't couldn couldn't didn didn't
+doesn doesn't hadn hadn't hasn hasn't haven haven't isn isn't ma mightn
+mightn't mustn mustn't needn needn't shan shan't shouldn shouldn't wasn
+wasn't weren weren't won won't wouldn wouldn't
+""".split())
+
+
+def is_available(name):
+    """True if the resource is in one of the local NLTK data directories"""
+    try:
+        nltk.data.find(RESOURCES[name])
+    except LookupError:
+        return False
+    return True
+
+
+def missing_resources():
+    return [name for name in RESOURCES if not is_available(name)]
+
+
+def load_stop_words(language="english"):
+    """Local NLTK stopwords, or the packaged English list if the corpus isn't installed"""
+    if is_available("stopwords"):
+        from nltk.corpus import stopwords
+        return set(stopwords.words(language))
+    if language != "english":
+        raise LookupError(f"NLTK stopwords for {language!r} are not installed; run: python nlp/nltk_setup.py")
+    return set(FALLBACK_STOP_WORDS)
+
+
+class LazyWordNetLemmatizer:
+    """WordNetLemmatizer that opens the corpus on first use, with an actionable error if it is missing"""
+
+    def __init__(self):
+        self._lemmatizer = None
+
+    def lemmatize(self, word):
+        if self._lemmatizer is None:
+            if not is_available("wordnet"):
+                raise LookupError("NLTK WordNet corpus is not installed; run: python nlp/nltk_setup.py")
+            from nltk.stem import WordNetLemmatizer
+            self._lemmatizer = WordNetLemmatizer()
+        return self._lemmatizer.lemmatize(word)
+
+
+def download(download_dir=None, force=False):
+    """Download missing (or, with `force`, all) resources; returns the names that failed"""
+    names = list(RESOURCES) if force else missing_resources()
+    failed = []
+    for name in names:
+        print(f"[RUN] Downloading NLTK {name}...")
+        if not nltk.download(name, download_dir=download_dir, quiet=True, raise_on_error=False):
+            failed.append(name)
+    return failed
+
+
+def main(download_dir=None, force=False):
+    failed = download(download_dir, force=force)
+    if failed:
+        print(f"[ERROR] Could not download: {', '.join(failed)}")
+        return False
+
+    if download_dir and download_dir not in nltk.data.path:
+        print(f"[WARNING] {download_dir} is not on the NLTK search path; set NLTK_DATA={download_dir}")
+    print("[SUCCESS] NLTK resources available: " + ", ".join(RESOURCES))
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Download the NLTK corpora used by preprocessing")
+    parser.add_argument("--download-dir", default=None, help="NLTK data directory (default: NLTK's choice)")
+    parser.add_argument("--force", action="store_true", help="re-download resources that are already installed")
+    args = parser.parse_args()
+    sys.exit(0 if main(args.download_dir, force=args.force) else 1)
@@ -0,0 +1,103 @@
+"""
+Process-pool helpers for the row-parallel NLP stages.
+
+A DataFrame (or Series) is split into contiguous row chunks, each chunk is
+handled by a worker process, and the results come back in the original
+row order. Send only the columns a stage needs and return compact results
+(e.g. masks or arrays) to keep pickling costs down.
+
+Workers run an optional initializer once at startup (e.g. to compile
+regexes or load models) so per-chunk calls only do the actual work.
+
+Large CSV files can also be split into byte ranges on row boundaries
+(csv_byte_ranges) so each worker reads and parses its own part of the
+file instead of the parent parsing all of it.
+"""
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+DEFAULT_CHUNKSIZE = 20_000
+DEFAULT_CHUNK_BYTES = 16 * 1024 * 1024
+
+
+def default_workers():
+    return os.cpu_count() or 1
+
+
+def row_chunks(df, chunksize):
+    """Contiguous row slices of `df` (DataFrame or Series) of at most `chunksize` rows"""
+    return [df.iloc[start:start + chunksize] for start in range(0, len(df), chunksize)]
+
+
+def map_items(func, items, workers=None, initializer=None, initargs=()):
+    """
+    Apply `func` to each of `items` in a process pool; returns the list of
+    results in item order. A single item or `workers=1` runs in-process,
+    after calling `initializer` there. `func` and `initializer` must be
+    picklable (module-level functions or functools.partial of them).
+    """
+    workers = workers or default_workers()
+    if workers <= 1 or len(items) <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        return [func(item) for item in items]
+
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(items)),
+        initializer=initializer,
+        initargs=initargs,
+    ) as pool:
+        # map() yields results in submission order
+        return list(pool.map(func, items))
+
+
+def map_chunks(func, df, workers=None, chunksize=DEFAULT_CHUNKSIZE,
+               initializer=None, initargs=()):
+    """
+    Apply `func` to row chunks of `df` in a process pool; returns the list
+    of results in chunk order (see map_items).
+    """
+    chunks = row_chunks(df, chunksize) or [df]
+    return map_items(func, chunks, workers=workers, initializer=initializer, initargs=initargs)
+
+
+def csv_byte_ranges(path, chunk_bytes=DEFAULT_CHUNK_BYTES):
+    """
+    (header line, [(start, end), ...]): the rows of a CSV file split into
+    byte ranges of about `chunk_bytes` that start and end on row
+    boundaries. A newline only ends a row outside a quoted field, i.e.
+    after an even number of quote characters since the last boundary
+    (escaped quotes come in pairs). The file is scanned, not parsed.
+    """
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, "rb") as f:
+        header = f.readline()
+        start = len(header)
+        while start < size:
+            block = f.read(chunk_bytes)
+            quoted = block.count(b'"') % 2 == 1
+            while True:
+                line = f.readline()
+                if not line:
+                    break
+                if line.count(b'"') % 2:
+                    quoted = not quoted
+                if not quoted:
+                    break
+            end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return header, ranges
+
+
+def read_csv_range(path, header, start, end, **csv_options):
+    """Parse the rows stored in bytes [start, end) of a CSV file, with its header line"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return pd.read_csv(io.BytesIO(header + data), **csv_options)
@@ -0,0 +1,143 @@
+"""
+Per-stage performance instrumentation for pipeline runs.
+
+Each stage is measured for input/output rows, wall and CPU time,
+throughput and memory: the tracemalloc peak during the stage (when memory
+tracing is enabled; it slows Python code down noticeably) and the process
+peak RSS after the stage (where the platform reports it).
+"""
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORTS_DIR = os.path.join(BASE_DIR, "pipeline_reports")
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 2)
+
+
+class StageTimer:
+    """
+    Context manager measuring one stage execution.
+
+        with StageTimer(rows_in=len(df)) as timer:
+            result = stage(df)
+            timer.rows_out = len(result)
+        timer.metrics  # dict
+    """
+
+    def __init__(self, rows_in=None, trace_memory=False):
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.unique_rows = None  # rows actually computed when duplicates are collapsed
+        self.trace_memory = trace_memory
+        self.metrics = {}
+        self._started_tracing = False
+
+    def __enter__(self):
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+
+        traced_peak = None
+        if self.trace_memory:
+            traced_peak = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+            if self._started_tracing:
+                tracemalloc.stop()
+
+        rows = self.rows_in if self.rows_in is not None else self.rows_out
+        self.metrics = {
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "wall_s": round(wall, 4),
+            "cpu_s": round(cpu, 4),
+            "rows_per_s": round(rows / wall, 1) if rows and wall > 0 else None,
+            "unique_rows": self.unique_rows,
+            "duplicate_ratio": _duplicate_ratio(self.rows_in, self.unique_rows),
+            "tracemalloc_peak_mb": traced_peak,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        return False
+
+
+def accumulate(total, metrics):
+    """Merge one measurement into running totals (used for chunked runs)"""
+    if not total:
+        return dict(metrics)
+    merged = dict(total)
+    for field in ("rows_in", "rows_out", "wall_s", "cpu_s", "unique_rows"):
+        if metrics.get(field) is not None:
+            merged[field] = round((merged.get(field) or 0) + metrics[field], 4)
+    for field in ("tracemalloc_peak_mb", "peak_rss_mb"):
+        values = [v for v in (merged.get(field), metrics.get(field)) if v is not None]
+        merged[field] = max(values) if values else None
+    rows = merged.get("rows_in") or merged.get("rows_out")
+    merged["rows_per_s"] = round(rows / merged["wall_s"], 1) if rows and merged["wall_s"] else None
+    merged["duplicate_ratio"] = _duplicate_ratio(merged.get("rows_in"), merged.get("unique_rows"))
+    return merged
+
+
+def _duplicate_ratio(rows, unique_rows):
+    if not rows or unique_rows is None:
+        return None
+    return round(1 - unique_rows / rows, 4)
+
+
+def write_run_report(summary, reports_dir=REPORTS_DIR):
+    """Write the JSON report for one company run; returns its path"""
+    os.makedirs(reports_dir, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    path = os.path.join(reports_dir, f"{summary['company']}_{stamp}.json")
+    report = {
+        "generated_at": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        **summary,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, default=str)
+    return path
+
+
+def print_stage_table(stages):
+    """Short per-stage summary table"""
+    print("\n[PERF] Stage            Status    Rows in   Rows out  Dup(%)  Wall(s)  CPU(s)   Rows/s     Peak RSS(MB)")
+    for entry in stages:
+        m = entry.get("metrics") or {}
+
+        def fmt(key, spec=""):
+            value = m.get(key)
+            return "-" if value is None else format(value, spec)
+
+        print(
+            f"       {entry['stage']:<16} {entry['status']:<9} "
+            f"{fmt('rows_in'):<9} {fmt('rows_out'):<9} {fmt('duplicate_ratio', '.1%'):<7} "
+            f"{fmt('wall_s', '.3f'):<8} "
+            f"{fmt('cpu_s', '.3f'):<8} {fmt('rows_per_s', '.0f'):<10} {fmt('peak_rss_mb')}"
+        )
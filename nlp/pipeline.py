@@ -0,0 +1,921 @@
+"""
+In-process DAG runner for the NLP pipeline.
+
+Stages are plain functions that receive the results of their dependencies
+and return a DataFrame (or any value), so data flows between stages in
+memory instead of through intermediate CSV files. Intermediate files are
+only written when checkpoints are enabled.
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from graphlib import TopologicalSorter
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from nlp import (
+    checkpoint,
+    companies,
+    dedup,
+    drift_detection,
+    employee_filter,
+    incremental,
+    lemma_cache,
+    near_duplicates,
+    nltk_setup,
+    parallel,
+    perf,
+    preprocess,
+    score_cache,
+    sentiment,
+    stage_cache,
+    token_corpus,
+)
+from nlp.companies import DEFAULT_COMPANY, RAW_CSV_OPTIONS, company_list, company_paths
+
+SUMMARY_PATH = os.path.join(BASE_DIR, "pipeline_summary.json")
+
+DEFAULT_CHUNKSIZE = 50_000
+
+
+class Stage:
+    """
+    A named pipeline step.
+
+    - func: called with the results of `deps` (in order)
+    - output_path: CSV written for this stage's result
+    - publish: always write `output_path`; otherwise it is only a checkpoint
+    - source: input file of a source stage, hashed for the cache key
+    - params / code: parameters and implementing modules, part of the cache key
+    """
+
+    def __init__(self, name, func, deps=(), output_path=None, publish=False,
+                 source=None, params=None, code=()):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.output_path = output_path
+        self.publish = publish
+        self.source = source
+        self.params = params or {}
+        self.code = tuple(code)
+
+
+def _cache_keys(stages, order):
+    """
+    Content-addressed key per stage, or None when a stage is not cacheable
+    (no source file / code version, or an uncacheable input).
+    """
+    keys = {}
+    for name in order:
+        stage = stages[name]
+        if stage.source is not None:
+            keys[name] = stage_cache.file_key(stage.source)
+            if stage.code:  # a source stage that also processes its input
+                keys[name] = stage_cache.stage_key(name, [keys[name]], stage.params, stage.code)
+        elif stage.code and stage.deps and all(keys.get(dep) for dep in stage.deps):
+            keys[name] = stage_cache.stage_key(
+                name, [keys[dep] for dep in stage.deps], stage.params, stage.code
+            )
+        else:
+            keys[name] = None
+    return keys
+
+
+def _pop_unique_rows(value):
+    """Take the unique-row count a stage recorded in its output's attrs"""
+    if isinstance(value, pd.DataFrame):
+        return value.attrs.pop("unique_rows", None)
+    return None
+
+
+def _pop_rows_in(value):
+    """Take the input row count a stage reading its own source file recorded"""
+    if isinstance(value, pd.DataFrame):
+        return value.attrs.pop("raw_rows", None)
+    return None
+
+
+def _row_count(value):
+    return len(value) if isinstance(value, pd.DataFrame) else None
+
+
+def run_dag(stages, write_checkpoints=False, append=False, cache=None, report=None,
+            trace_memory=False):
+    """
+    Execute stages in dependency order.
+    Returns (success, results) where results maps stage name -> output.
+    On failure the error is reported and downstream stages are not run.
+    With `append`, stage outputs are appended to existing files.
+
+    With a StageCache, stages whose key is already cached are not run:
+    their output is restored from the cache when something needs it
+    (a published/checkpoint file or a downstream stage that must run) and
+    skipped entirely otherwise. `report` (a list) receives one entry per
+    stage saying whether it ran, was restored or was skipped, with its
+    performance metrics (see nlp/perf.py).
+    """
+    by_name = {stage.name: stage for stage in stages}
+    order = list(TopologicalSorter(
+        {stage.name: stage.deps for stage in stages}
+    ).static_order())
+    dependents = {name: [other.name for other in stages if name in other.deps] for name in by_name}
+    keys = _cache_keys(by_name, order) if cache is not None else {}
+    report = report if report is not None else []
+
+    results = {}
+
+    def storable(stage):
+        # Plain source stages are keyed by their input file but never stored
+        return bool(stage.code)
+
+    def is_cached(name):
+        return cache is not None and storable(by_name[name]) and cache.contains(keys.get(name))
+
+    def materialize(name):
+        if name in results:
+            return results[name]
+        stage = by_name[name]
+
+        if is_cached(name):
+            with perf.StageTimer(trace_memory=trace_memory) as timer:
+                result = cache.load(keys[name])
+                timer.rows_out = _row_count(result)
+            results[name] = result
+            print(f"[CACHE] Restored {name} from cache ({keys[name][:12]})")
+            report.append({
+                "stage": name, "status": "restored", "key": keys[name], "metrics": timer.metrics,
+            })
+            return result
+
+        inputs = [materialize(dep) for dep in stage.deps]
+        rows_in = sum(_row_count(value) or 0 for value in inputs) if inputs else None
+        print(f"[RUN] Running {name} ...")
+        with perf.StageTimer(rows_in=rows_in, trace_memory=trace_memory) as timer:
+            result = stage.func(*inputs)
+            timer.rows_out = _row_count(result)
+            timer.unique_rows = _pop_unique_rows(result)
+            timer.rows_in = _pop_rows_in(result) or rows_in
+        results[name] = result
+        if cache is not None and keys.get(name) and storable(stage):
+            cache.store(keys[name], result)
+
+        rows = f", {len(result)} rows" if isinstance(result, pd.DataFrame) else ""
+        if timer.metrics["duplicate_ratio"]:
+            rows += f", {timer.metrics['duplicate_ratio']:.0%} duplicates collapsed"
+        print(f"  [DONE] {name} ({timer.metrics['wall_s']:.2f}s{rows})")
+        report.append({
+            "stage": name, "status": "ran", "key": keys.get(name), "metrics": timer.metrics,
+        })
+        return result
+
+    def writes_output(stage):
+        return bool(stage.output_path and (stage.publish or write_checkpoints))
+
+    # Walk the DAG backwards to find which outputs are actually needed:
+    # sinks and written files always, plus the inputs of any stage that
+    # has to run because it is not cached.
+    required = set()
+    for name in reversed(order):
+        stage = by_name[name]
+        if writes_output(stage) or not dependents[name]:
+            required.add(name)
+        if name in required and not is_cached(name):
+            required.update(stage.deps)
+
+    for name in order:
+        stage = by_name[name]
+        if name not in required:
+            print(f"[SKIP] {name} unchanged (cached)")
+            report.append({"stage": name, "status": "skipped", "key": keys.get(name)})
+            continue
+
+        try:
+            result = materialize(name)
+
+            if writes_output(stage):
+                if stage.publish:
+                    incremental.publish_csv(result, stage.output_path, append=append)
+                elif append:
+                    incremental.append_csv(result, stage.output_path)
+                else:
+                    result.to_csv(stage.output_path, index=False)
+                print(f"  Saved to: {stage.output_path}")
+        except Exception:
+            print(f"\n[ERROR] Error while running {name}")
+            print(traceback.format_exc())
+            return False, results
+
+    return True, results
+
+
+def _write_token_corpus(clean, directory):
+    corpus = token_corpus.write(clean["clean_text"], directory)
+    print(f"  Saved to: {directory}")
+    return corpus
+
+
+def build_stages(company=DEFAULT_COMPANY, load_raw=None, drift=None, near_dedup=None,
+                 filter_workers=1, clean_workers=1, score_workers=1, write_tokens=False):
+    """
+    Pipeline for one company: raw -> filter -> clean -> score -> drift.
+    `load_raw` and `drift` replace the source and sink stage functions
+    (replaced stages are not cacheable). With `filter_workers` > 1 (None =
+    one per CPU) the filter runs in a process pool; when it reads the raw
+    file itself, each worker parses its own byte ranges and the filter is
+    the source stage (there is no load_raw stage). `clean_workers` and
+    `score_workers` clean and score the distinct texts in a process pool
+    the same way. With a `near_dedup` similarity threshold, a
+    near-duplicate clustering stage between filter and clean adds a
+    `cluster_id` column, and clean and score run on one representative row
+    per cluster whose results the whole cluster shares. `write_tokens` adds
+    a sink stage writing the clean texts' token corpus (nlp/token_corpus.py).
+    """
+    paths = company_paths(company)
+    context_substrings, context_words, keywords, signals = employee_filter.company_terms(company)
+    clean = partial(preprocess.clean_dataframe, workers=clean_workers)
+    score = partial(sentiment.score_dataframe, workers=score_workers)
+    per_cluster = []
+    if near_dedup is not None:
+        clean = partial(near_duplicates.map_representatives, clean, columns=["clean_text"])
+        score = partial(near_duplicates.map_representatives, score, columns=["sentiment"])
+        per_cluster = [near_duplicates]
+    filter_params = {
+        "company": company,
+        "context_substrings": context_substrings,
+        "context_words": context_words,
+        "keywords": keywords,
+        "signals": signals,
+    }
+    if filter_workers != 1 and load_raw is None:
+        source_stages = [Stage(
+            "employee_filter",
+            partial(employee_filter.filter_employee_csv, paths["raw"], company=company,
+                    workers=filter_workers),
+            output_path=paths["filtered"],
+            source=paths["raw"],
+            params=filter_params,
+            code=[employee_filter, companies, parallel],
+        )]
+    else:
+        source_stages = [
+            Stage(
+                "load_raw",
+                load_raw or (lambda: pd.read_csv(paths["raw"], **RAW_CSV_OPTIONS)),
+                source=None if load_raw else paths["raw"],
+            ),
+            Stage(
+                "employee_filter",
+                partial(employee_filter.filter_employee_tweets, company=company,
+                        workers=filter_workers),
+                deps=["load_raw"],
+                output_path=paths["filtered"],
+                params=filter_params,
+                code=[employee_filter, companies, parallel],
+            ),
+        ]
+    stages = source_stages + [
+        Stage(
+            "preprocess",
+            clean,
+            deps=["near_duplicates" if near_dedup is not None else "employee_filter"],
+            output_path=paths["clean"],
+            params={
+                "stop_words": sorted(preprocess.stop_words),
+                "lemmatizer": preprocess.lemma_cache.version,
+            },
+            code=[preprocess, dedup, lemma_cache, nltk_setup, parallel] + per_cluster,
+        ),
+        Stage(
+            "sentiment",
+            score,
+            deps=["preprocess"],
+            output_path=paths["sentiment"],
+            publish=True,
+            params={
+                "positive_threshold": sentiment.POSITIVE_THRESHOLD,
+                "negative_threshold": sentiment.NEGATIVE_THRESHOLD,
+                "analyzer": score_cache.analyzer_version(),
+            },
+            code=[sentiment, dedup, score_cache, parallel] + per_cluster,
+        ),
+        Stage(
+            "drift_detection",
+            drift or partial(drift_detection.run_drift_detection, **drift_detection.DRIFT_SETTINGS),
+            deps=["sentiment"],
+            params=drift_detection.DRIFT_SETTINGS,
+            code=[] if drift else [drift_detection],
+        ),
+    ]
+    if near_dedup is not None:
+        stages.insert(len(source_stages), Stage(
+            "near_duplicates",
+            partial(near_duplicates.cluster_near_duplicates, threshold=near_dedup),
+            deps=["employee_filter"],
+            params={
+                "threshold": near_dedup,
+                "num_perm": near_duplicates.NUM_PERM,
+                "shingle_size": near_duplicates.SHINGLE_SIZE,
+                "seed": near_duplicates.SEED,
+                "bucket_fanout": near_duplicates.BUCKET_FANOUT,
+            },
+            code=[near_duplicates],
+        ))
+    if write_tokens:
+        stages.append(Stage(
+            "token_corpus",
+            partial(_write_token_corpus, directory=paths["tokens"]),
+            deps=["preprocess"],
+        ))
+    return stages
+
+
+def _stage_outputs(company):
+    paths = company_paths(company)
+    return {
+        "employee_filter": paths["filtered"],
+        "preprocess": paths["clean"],
+        "sentiment": paths["sentiment"],
+    }
+
+
+def _summarize(company, mode, results, report=()):
+    """Per-company run summary (rows, sentiment counts, drift weeks)"""
+    summary = {"company": company, "ok": True, "mode": mode}
+    if "load_raw" in results:
+        summary["raw_rows"] = len(results["load_raw"])
+    for entry in report:
+        # A filter stage that read the raw file itself records its rows
+        if entry["stage"] == "employee_filter" and "raw_rows" not in summary:
+            rows_in = entry.get("metrics", {}).get("rows_in")
+            if rows_in is not None:
+                summary["raw_rows"] = rows_in
+    if "employee_filter" in results:
+        summary["filtered_rows"] = len(results["employee_filter"])
+    if "sentiment" in results:
+        counts = results["sentiment"]["sentiment"].value_counts()
+        summary["sentiment_counts"] = {label: int(n) for label, n in counts.items()}
+    if "drift_detection" in results:
+        summary["drift_weeks"] = [str(week.date()) for week in results["drift_detection"]]
+    return summary
+
+
+# ===============================
+# Incremental mode
+# ===============================
+def run_incremental(company=DEFAULT_COMPANY, full_rebuild=False, trace_memory=False,
+                    filter_workers=1, clean_workers=1, score_workers=1):
+    """
+    Process only raw rows added since the last run and append the results
+    to the filtered, clean and sentiment outputs.
+    Falls back to (or forces, with `full_rebuild`) a full rebuild, which
+    rewrites the outputs and swaps in the published one atomically.
+    Returns a run summary dict.
+    """
+    raw_path = company_paths(company)["raw"]
+    outputs = _stage_outputs(company)
+    state = None if full_rebuild else incremental.load_state(company)
+
+    offset, reason = incremental.plan_delta(state, raw_path, outputs)
+    if full_rebuild:
+        reason = "full rebuild requested"
+
+    # Only the bytes past the watermark are read and parsed
+    delta, end_offset = incremental.read_csv_from(raw_path, offset, **RAW_CSV_OPTIONS)
+    if offset is None:
+        mode = "full_rebuild"
+        start = 0
+        print(f"[MODE] Full rebuild ({reason})")
+        # Only the checkpoint outputs are removed: the published sentiment
+        # file keeps serving the old data until the rebuild replaces it
+        for stage, path in outputs.items():
+            if stage != "sentiment" and os.path.exists(path):
+                os.remove(path)
+        state = {"weekly_stats": {}, "stages": {}}
+    else:
+        mode = "incremental"
+        start = state.get("raw_rows", 0)
+        print(f"[MODE] Incremental: {len(delta)} new raw rows "
+              f"(watermark at row {start}, byte {offset})")
+    delta.index = pd.RangeIndex(start, start + len(delta))
+
+    if delta.empty and offset is not None:
+        print("[SKIP] No new raw rows; outputs are up to date")
+        drift_weeks = drift_detection.detect_drift(
+            incremental.weekly_series(state["weekly_stats"])
+        )
+        drift_detection.report_drift(drift_weeks)
+        return _summarize(company, "up_to_date", {"load_raw": delta, "drift_detection": drift_weeks})
+
+    def update_drift(scored):
+        state["weekly_stats"] = incremental.merge_weekly_stats(
+            state.get("weekly_stats"),
+            drift_detection.weekly_sentiment_stats(scored),
+        )
+        return drift_detection.detect_drift(incremental.weekly_series(state["weekly_stats"]))
+
+    report = []
+    stages = build_stages(
+        company, load_raw=lambda: delta, drift=update_drift, filter_workers=filter_workers,
+        clean_workers=clean_workers, score_workers=score_workers,
+    )
+    ok, results = run_dag(
+        stages, write_checkpoints=True, append=offset is not None, report=report,
+        trace_memory=trace_memory,
+    )
+    if not ok:
+        # Outputs may hold a partial append; force a rebuild next time
+        if os.path.exists(incremental.state_path(company)):
+            os.remove(incremental.state_path(company))
+        return {"company": company, "ok": False, "mode": mode, "stages": report}
+
+    # Per-stage watermarks: rows consumed and produced so far
+    stage_state = state.setdefault("stages", {})
+    for name in ("employee_filter", "preprocess", "sentiment"):
+        previous = stage_state.get(name, {"rows_out": 0})
+        stage_state[name] = {"rows_out": previous["rows_out"] + len(results[name])}
+
+    if "createdAt" in delta.columns and delta["createdAt"].notna().any():
+        newest = str(delta["createdAt"].max())
+        state["max_createdAt"] = max(state.get("max_createdAt") or newest, newest)
+    state["raw_rows"] = start + len(delta)
+    state["raw_fingerprint"] = incremental.prefix_fingerprint(raw_path, end_offset)
+    state["outputs"] = incremental.output_signature(outputs)
+    incremental.save_state(company, state)
+
+    print("\nNew rows sentiment distribution:")
+    print(results["sentiment"]["sentiment"].value_counts())
+    drift_detection.report_drift(results["drift_detection"])
+    summary = _summarize(company, mode, results)
+    summary["stages"] = report
+    return summary
+
+
+# ===============================
+# Streaming mode
+# ===============================
+def run_streaming(company=DEFAULT_COMPANY, chunksize=DEFAULT_CHUNKSIZE, write_checkpoints=False,
+                  trace_memory=False, resume=True, filter_workers=1, clean_workers=1,
+                  score_workers=1):
+    """
+    Run filter -> clean -> score chunk by chunk so memory stays bounded by
+    `chunksize` rather than by the size of the raw file.
+    Each chunk's results are appended to temporary files that replace the
+    outputs once the whole file is processed; the outputs are identical to
+    a batch run. Drift detection works from merged weekly sum/count stats.
+    Progress is checkpointed after every chunk, and unless `resume` is False
+    an interrupted run continues from the last committed chunk.
+    Returns a run summary dict.
+    """
+    paths = company_paths(company)
+    outputs = {"sentiment": paths["sentiment"]}
+    if write_checkpoints:
+        outputs.update({"employee_filter": paths["filtered"], "preprocess": paths["clean"]})
+    partial_paths = {stage: f"{path}.partial" for stage, path in outputs.items()}
+
+    print(f"[MODE] Streaming {paths['raw']} in chunks of {chunksize} rows")
+    stage_funcs = [
+        ("employee_filter", partial(
+            employee_filter.filter_employee_tweets, company=company, workers=filter_workers
+        )),
+        ("preprocess", partial(preprocess.clean_dataframe, workers=clean_workers)),
+        ("sentiment", partial(sentiment.score_dataframe, workers=score_workers)),
+    ]
+    fingerprint = checkpoint.run_fingerprint(
+        paths["raw"], chunksize, outputs,
+        [employee_filter, preprocess, sentiment, dedup, score_cache, drift_detection],
+    )
+    manifest = checkpoint.resume_point(company, fingerprint, partial_paths) if resume else None
+    if manifest is None:
+        for path in partial_paths.values():
+            if os.path.exists(path):
+                os.remove(path)
+        start_chunk, raw_offset = 0, None
+        progress = {"raw_rows": 0, "filtered_rows": 0, "sentiment_counts": {}, "weekly_stats": {}}
+    else:
+        start_chunk, raw_offset = manifest["next_chunk"], manifest["raw_offset"]
+        progress = manifest["progress"]
+        print(f"[RESUME] Continuing from chunk {start_chunk} at byte {raw_offset} "
+              "(checkpoint manifest found)")
+    metrics = {}
+
+    # Committed chunks are skipped by seeking, not by re-reading them
+    reader = incremental.iter_csv_chunks(paths["raw"], chunksize, raw_offset, **RAW_CSV_OPTIONS)
+    index = start_chunk
+    while True:
+        with perf.StageTimer(trace_memory=trace_memory) as timer:
+            chunk, raw_offset = next(reader, (None, raw_offset))
+            timer.rows_out = 0 if chunk is None else len(chunk)
+        if chunk is None:
+            break
+        chunk.index = pd.RangeIndex(progress["raw_rows"], progress["raw_rows"] + len(chunk))
+        metrics["load_raw"] = perf.accumulate(metrics.get("load_raw"), timer.metrics)
+
+        chunk_results = {}
+        data = chunk
+        for name, func in stage_funcs:
+            try:
+                with perf.StageTimer(rows_in=len(data), trace_memory=trace_memory) as timer:
+                    data = func(data)
+                    timer.rows_out = len(data)
+                    timer.unique_rows = _pop_unique_rows(data)
+            except Exception:
+                print(f"\n[ERROR] Error while running {name} on chunk {index}")
+                print(traceback.format_exc())
+                if index > start_chunk or manifest is not None:
+                    print(f"[RESUME] Chunks before {index} are checkpointed; re-run to resume")
+                return {"company": company, "ok": False, "mode": "streaming"}
+            metrics[name] = perf.accumulate(metrics.get(name), timer.metrics)
+            chunk_results[name] = data
+
+        for stage, path in partial_paths.items():
+            incremental.append_csv(chunk_results[stage], path)
+
+        scored = chunk_results["sentiment"]
+        counts = progress["sentiment_counts"]
+        for label, n in scored["sentiment"].value_counts().items():
+            counts[label] = counts.get(label, 0) + int(n)
+        progress["weekly_stats"] = incremental.merge_weekly_stats(
+            progress["weekly_stats"], drift_detection.weekly_sentiment_stats(scored)
+        )
+        progress["raw_rows"] += len(chunk)
+        progress["filtered_rows"] += len(chunk_results["employee_filter"])
+        index += 1
+        checkpoint.commit_chunk(company, fingerprint, index, raw_offset, partial_paths, progress)
+        print(f"  [CHUNK] {index - 1}: {len(chunk)} raw -> {len(scored)} scored rows")
+
+    for stage, path in outputs.items():
+        if os.path.exists(partial_paths[stage]):
+            if stage == "sentiment":
+                incremental.publish_file(partial_paths[stage], path)
+            else:
+                os.replace(partial_paths[stage], path)
+            print(f"  Saved to: {path}")
+    checkpoint.clear(company)
+
+    with perf.StageTimer(trace_memory=trace_memory) as timer:
+        drift_weeks = drift_detection.detect_drift(
+            incremental.weekly_series(progress["weekly_stats"]), **drift_detection.DRIFT_SETTINGS
+        )
+    metrics["drift_detection"] = timer.metrics
+    print("\nSentiment distribution:")
+    print(pd.Series(progress["sentiment_counts"], dtype=int))
+    drift_detection.report_drift(drift_weeks)
+
+    return {
+        "company": company,
+        "ok": True,
+        "mode": "streaming",
+        "chunks": index,
+        "resumed_from_chunk": start_chunk,
+        "raw_rows": progress["raw_rows"],
+        "filtered_rows": progress["filtered_rows"],
+        "sentiment_counts": progress["sentiment_counts"],
+        "drift_weeks": [str(week.date()) for week in drift_weeks],
+        "stages": [
+            {"stage": name, "status": "ran", "metrics": stage_metrics}
+            for name, stage_metrics in metrics.items()
+        ],
+    }
+
+
+# ===============================
+# Single company / all companies
+# ===============================
+def run_full(company=DEFAULT_COMPANY, write_checkpoints=False, use_cache=True,
+             trace_memory=False, near_dedup=None, filter_workers=1, clean_workers=1,
+             score_workers=1, write_tokens=False):
+    """
+    Batch run of every stage; unchanged stages are reused from the stage
+    cache unless `use_cache` is False. `near_dedup` enables near-duplicate
+    clustering at that similarity threshold; `filter_workers`,
+    `clean_workers`, `score_workers` and `write_tokens` as in build_stages().
+    Returns a run summary dict.
+    """
+    report = []
+    ok, results = run_dag(
+        build_stages(
+            company, near_dedup=near_dedup, filter_workers=filter_workers,
+            clean_workers=clean_workers, score_workers=score_workers,
+            write_tokens=write_tokens,
+        ),
+        write_checkpoints=write_checkpoints,
+        cache=stage_cache.StageCache() if use_cache else None,
+        report=report,
+        trace_memory=trace_memory,
+    )
+    if not ok:
+        return {"company": company, "ok": False, "mode": "full", "stages": report}
+
+    reused = [entry["stage"] for entry in report if entry["status"] != "ran"]
+    if reused:
+        print(f"\n[CACHE] Reused without re-running: {', '.join(reused)}")
+
+    print("\nSentiment distribution:")
+    print(results["sentiment"]["sentiment"].value_counts())
+    drift_detection.report_drift(results["drift_detection"])
+    summary = _summarize(company, "full", results, report)
+    if "near_duplicates" in results:
+        summary["near_duplicate_clusters"] = int(results["near_duplicates"]["cluster_id"].nunique())
+        print(f"[DEDUP] {summary['filtered_rows']} texts in "
+              f"{summary['near_duplicate_clusters']} near-duplicate clusters")
+    summary["stages"] = report
+    return summary
+
+
+def run_company(company=DEFAULT_COMPANY, write_checkpoints=False,
+                incremental_mode=False, full_rebuild=False, use_cache=True,
+                stream=False, chunksize=DEFAULT_CHUNKSIZE, trace_memory=False,
+                resume=True, near_dedup=None, filter_workers=1, clean_workers=1,
+                score_workers=1, write_tokens=False, write_report=True):
+    """
+    Run the pipeline for one company; returns a run summary dict.
+    Full (non-incremental) runs reuse unchanged stages from the stage cache
+    unless `use_cache` is False and cluster near-duplicates when
+    `near_dedup` is a similarity threshold. `stream` processes the raw file
+    in chunks and, unless `resume` is False, resumes an interrupted
+    streaming run. `filter_workers` processes filter the raw rows,
+    `clean_workers` clean the filtered texts and `score_workers` score the
+    clean texts (None = one per CPU). `write_tokens` also writes the token
+    corpus of the clean texts (full runs only).
+    Every run ends with a per-stage performance table and, unless
+    `write_report` is False, a JSON report in pipeline_reports/.
+    """
+    if not os.path.exists(company_paths(company)["raw"]):
+        print(f"[WARNING] Raw data not found for {company}: {company_paths(company)['raw']}")
+        return {"company": company, "ok": False, "error": "raw data not found"}
+
+    if near_dedup is not None and (stream or incremental_mode or full_rebuild):
+        print("[WARNING] Near-duplicate clustering needs the whole dataset; "
+              "ignored in streaming/incremental runs")
+    if write_tokens and (stream or incremental_mode or full_rebuild):
+        print("[WARNING] The token corpus is written from the whole clean dataset; "
+              "ignored in streaming/incremental runs")
+
+    cache_before = sentiment.score_cache.stats()
+    start = time.perf_counter()
+    if stream:
+        summary = run_streaming(
+            company, chunksize=chunksize, write_checkpoints=write_checkpoints,
+            trace_memory=trace_memory, resume=resume, filter_workers=filter_workers,
+            clean_workers=clean_workers, score_workers=score_workers,
+        )
+    elif incremental_mode or full_rebuild:
+        summary = run_incremental(
+            company, full_rebuild=full_rebuild, trace_memory=trace_memory,
+            filter_workers=filter_workers, clean_workers=clean_workers,
+            score_workers=score_workers,
+        )
+    else:
+        summary = run_full(
+            company, write_checkpoints=write_checkpoints, use_cache=use_cache,
+            trace_memory=trace_memory, near_dedup=near_dedup, filter_workers=filter_workers,
+            clean_workers=clean_workers, score_workers=score_workers,
+            write_tokens=write_tokens,
+        )
+    summary["wall_s"] = round(time.perf_counter() - start, 4)
+    summary["peak_rss_mb"] = perf.peak_rss_mb()
+
+    cache_after = sentiment.score_cache.stats()
+    hits = cache_after["hits"] - cache_before["hits"]
+    misses = cache_after["misses"] - cache_before["misses"]
+    if hits or misses:
+        summary["score_cache"] = {"hits": hits, "misses": misses}
+        print(f"[CACHE] VADER scores: {hits} cached, {misses} scored "
+              f"({hits / (hits + misses):.1%} hit rate)")
+
+    stages = summary.get("stages", [])
+    for entry in stages:
+        entry.pop("key", None)
+    if stages:
+        perf.print_stage_table(stages)
+    if write_report:
+        report_path = perf.write_run_report(summary)
+        summary["report_path"] = report_path
+        print(f"[PERF] Run report saved to: {report_path}")
+    return summary
+
+
+def run_company_captured(company, **options):
+    """Pool worker: run one company and return (summary, captured output)"""
+    buffer = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(buffer):
+        try:
+            summary = run_company(company, **options)
+        except Exception:
+            print(traceback.format_exc())
+            summary = {"company": company, "ok": False, "error": "unhandled exception"}
+    summary["elapsed_s"] = round(time.perf_counter() - start, 3)
+    return summary, buffer.getvalue()
+
+
+def run_all_companies(companies=None, workers=None, **options):
+    """
+    Run every configured company's pipeline in a process pool.
+    Each company's log is printed as a block once it finishes, and a
+    combined summary is written to pipeline_summary.json.
+    Returns the list of per-company summaries.
+    """
+    companies = companies or company_list()
+    workers = workers or min(len(companies), os.cpu_count() or 1)
+    print(f"[POOL] Running {len(companies)} companies with {workers} worker(s)")
+
+    summaries = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(run_company_captured, company, **options)
+            for company in companies
+        ]
+        for company, future in zip(companies, futures):
+            summary, log = future.result()
+            print(f"\n----- {company.upper()} -----")
+            print(log, end="")
+            summaries.append(summary)
+
+    with open(SUMMARY_PATH, "w", encoding="utf-8") as f:
+        json.dump({
+            "generated_at": pd.Timestamp.now().isoformat(),
+            "workers": workers,
+            "companies": summaries,
+        }, f, indent=2)
+
+    print("\n[SUMMARY] Company        Status  Raw     Filtered  Time")
+    for summary in summaries:
+        status = "OK" if summary["ok"] else "FAILED"
+        print(
+            f"          {summary['company']:<14} {status:<7} "
+            f"{summary.get('raw_rows', '-')!s:<7} {summary.get('filtered_rows', '-')!s:<9} "
+            f"{summary.get('elapsed_s', 0):.2f}s"
+        )
+    print(f"Saved summary to: {SUMMARY_PATH}")
+    return summaries
+
+
+def run_pipeline(write_checkpoints=False, incremental_mode=False, full_rebuild=False,
+                 company=DEFAULT_COMPANY, all_companies=False, workers=None,
+                 use_cache=True, stream=False, chunksize=DEFAULT_CHUNKSIZE,
+                 trace_memory=False, resume=True, near_dedup=None, filter_workers=1,
+                 clean_workers=1, score_workers=1, write_tokens=False):
+    """Run the pipeline in-process; returns True on success"""
+    options = {
+        "write_checkpoints": write_checkpoints,
+        "incremental_mode": incremental_mode,
+        "full_rebuild": full_rebuild,
+        "use_cache": use_cache,
+        "stream": stream,
+        "chunksize": chunksize,
+        "trace_memory": trace_memory,
+        "resume": resume,
+        "near_dedup": near_dedup,
+        "filter_workers": filter_workers,
+        "clean_workers": clean_workers,
+        "score_workers": score_workers,
+        "write_tokens": write_tokens,
+    }
+    if all_companies:
+        summaries = run_all_companies(workers=workers, **options)
+        return all(summary["ok"] for summary in summaries)
+
+    return run_company(company, **options)["ok"]
+
+
+# ===============================
+# Command line
+# ===============================
+def add_pipeline_args(parser):
+    """Add the pipeline options (see run_pipeline) to an argparse parser"""
+    parser.add_argument(
+        "--checkpoints",
+        action="store_true",
+        help="also write the intermediate filtered/clean CSV files",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only process raw rows added since the last incremental run",
+    )
+    parser.add_argument(
+        "--full-rebuild",
+        action="store_true",
+        help="reprocess everything and reset the incremental watermarks",
+    )
+    parser.add_argument("--company", default=DEFAULT_COMPANY, help="company id (default: microsoft)")
+    parser.add_argument(
+        "--all-companies",
+        action="store_true",
+        help="run every configured company in a process pool",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="process pool size for --all-companies (default: one per company, up to CPU count)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="re-run every stage instead of reusing unchanged stages from .pipeline_cache/",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="process the raw file in chunks with bounded memory",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=DEFAULT_CHUNKSIZE,
+        help=f"rows per chunk for --stream (default: {DEFAULT_CHUNKSIZE})",
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="ignore the chunk checkpoint of an interrupted --stream run and start over",
+    )
+    parser.add_argument(
+        "--near-dedup",
+        type=float,
+        nargs="?",
+        const=near_duplicates.DEFAULT_THRESHOLD,
+        default=None,
+        metavar="THRESHOLD",
+        help="cluster near-duplicate texts and clean/score one text per cluster (default threshold: "
+             f"{near_duplicates.DEFAULT_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--filter-workers",
+        type=int,
+        default=1,
+        help="filter raw rows in this many processes, each reading its own part of "
+             "the raw file (0 = one per CPU; default: 1)",
+    )
+    parser.add_argument(
+        "--clean-workers",
+        type=int,
+        default=1,
+        help="clean the distinct filtered texts in this many processes "
+             "(0 = one per CPU; default: 1)",
+    )
+    parser.add_argument(
+        "--score-workers",
+        type=int,
+        default=1,
+        help="score the distinct clean texts missing from the score cache in this many "
+             "processes (0 = one per CPU; default: 1)",
+    )
+    parser.add_argument(
+        "--tokens",
+        action="store_true",
+        help="also write the memory-mappable token corpus of the clean texts (full runs only)",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="record the tracemalloc peak of every stage (slower)",
+    )
+    return parser
+
+
+def pipeline_options(args):
+    """run_pipeline() keyword arguments from options parsed by add_pipeline_args()"""
+    return {
+        "write_checkpoints": args.checkpoints,
+        "incremental_mode": args.incremental,
+        "full_rebuild": args.full_rebuild,
+        "company": args.company,
+        "all_companies": args.all_companies,
+        "workers": args.workers,
+        "use_cache": not args.no_cache,
+        "stream": args.stream,
+        "chunksize": args.chunksize,
+        "trace_memory": args.trace_memory,
+        "resume": not args.no_resume,
+        "near_dedup": args.near_dedup,
+        "filter_workers": args.filter_workers or None,
+        "clean_workers": args.clean_workers or None,
+        "score_workers": args.score_workers or None,
+        "write_tokens": args.tokens,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the NLP pipeline in-process")
+    add_pipeline_args(parser)
+    args = parser.parse_args()
+
+    ok = run_pipeline(**pipeline_options(args))
+    sys.exit(0 if ok else 1)
@@ -1,40 +1,192 @@
+import numpy as np
 import pandas as pd
 import os
 import re
-import nltk
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
+import sys
+from functools import partial
 
-# Download required NLTK data (first run only)
-nltk.download("stopwords")
-nltk.download("wordnet")
+import nltk
 
 # Paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-input_path = os.path.join(BASE_DIR, "microsoft_employee_filtered.csv")
-output_path = os.path.join(BASE_DIR, "microsoft_employee_clean.csv")
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from nlp import dedup, nltk_setup, parallel, token_corpus
+from nlp.lemma_cache import LemmaCache
+from nlp.companies import DEFAULT_COMPANY, company_paths
 
-# Load data
-df = pd.read_csv(input_path)
+# Resolved offline; fetch the corpora with: python nlp/nltk_setup.py
+stop_words = nltk_setup.load_stop_words()
+lemmatizer = nltk_setup.LazyWordNetLemmatizer()
 
-stop_words = set(stopwords.words("english"))
-lemmatizer = WordNetLemmatizer()
+# WordNet is opened on the first word missing from the lemma table, so a
+# warm table needs no corpus at all; the table persists across runs
+lemma_cache = LemmaCache(lemmatizer.lemmatize, version=f"nltk-{nltk.__version__}-wordnet")
+lemma_cache.load()
+
+# One pass equivalent to the sequence of substitutions
+#   http\S+ (URLs) -> @\w+ (mentions) -> #\w+ (hashtags) -> [^a-z\s] (emojis & symbols)
+# A removed URL is always followed by whitespace (or the end) and a mention
+# or hashtag always ends at a non-word character, so no substitution could
+# create a match for a later one. The only overlap is a mention/hashtag
+# running into a URL; the lookahead stops it there so the URL is removed
+# whole, as the URL pass did first. Other symbols are removed a run at a
+# time; a lone @ or # (not starting a mention/hashtag) goes by itself.
+NORMALIZE_PATTERN = re.compile(r"http\S+|[@#](?:(?!http\S)\w)+|[^a-z\s@#]+|[@#]")
 
 def clean_text(text):
-    text = str(text).lower()
-    text = re.sub(r"http\S+", "", text)     # remove URLs
-    text = re.sub(r"@\w+", "", text)        # remove mentions
-    text = re.sub(r"#\w+", "", text)        # remove hashtags
-    text = re.sub(r"[^a-z\s]", "", text)    # remove emojis & symbols
+    words = NORMALIZE_PATTERN.sub("", str(text).lower()).split()
+    lemmatize = lemma_cache.lemmatize
+    return " ".join([lemmatize(w) for w in words if w not in stop_words])
+
+# clean_column() normalizes in the original order, each step over the whole
+# column: URLs, then mentions and hashtags (their matches are disjoint, so
+# one pass does both), then every other symbol by deleting bytes of the
+# UTF-8 encoding (all non-ASCII bytes and ASCII other than a-z and
+# whitespace), after mapping non-ASCII whitespace to spaces
+URL_PATTERN = re.compile(r"http\S+")
+TAG_PATTERN = re.compile(r"[@#]\w+")
+_UNICODE_SPACES = [c for c in map(chr, range(0x80, 0x10000)) if c.isspace()]
+_SYMBOL_BYTES = bytes(c for c in range(256) if not (97 <= c <= 122 or (c < 128 and chr(c).isspace())))
+
+# Row marker token for clean_column(); normalization removes every \0 from
+# the texts themselves
+_ROW = "\0"
+
+def clean_column(texts):
+    """
+    clean_text() for a whole sequence of texts, run as string operations on
+    one joined string instead of a Python call per row: the rows are joined
+    with newlines, lowercased, normalized and split at once, and stop words
+    and lemmas are resolved once per distinct word and broadcast back to the
+    tokens. Returns a list equal to [clean_text(t) for t in texts].
+    """
+    strings = [str(text) for text in texts]
+    if not strings:
+        return []
+    joined = "\n".join(strings)
+    if joined.count("\n") != len(strings) - 1:
+        # A newline inside a row is a word break like any other whitespace
+        joined = "\n".join([string.replace("\n", " ") for string in strings])
+
+    text = TAG_PATTERN.sub("", URL_PATTERN.sub("", joined.lower()))
+    if not text.isascii():
+        for space in _UNICODE_SPACES:
+            if space in text:
+                text = text.replace(space, " ")
+    normalized = text.encode("utf-8").translate(None, _SYMBOL_BYTES).decode("ascii")
+    tokens = normalized.replace("\n", f" {_ROW} ").split()
+    codes, words = pd.factorize(np.array(tokens, dtype=object))
+
+    lemmatize = lemma_cache.lemmatize
+    replacements = np.array(
+        ["\n" if w == _ROW else None if w in stop_words else lemmatize(w) for w in words],
+        dtype=object,
+    )
+    keep = (replacements != None)[codes]  # noqa: E711 (elementwise)
+    cleaned = " ".join(replacements.take(codes[keep]))
+    return cleaned.replace(" \n", "\n").replace("\n ", "\n").split("\n")
+
+CLEAN_MODES = ("vectorized", "rowwise")
+
+def _clean_texts(texts, mode):
+    if mode == "vectorized":
+        return clean_column(texts)
+    return [clean_text(text) for text in texts]
+
+def clean_dataframe(df, mode="vectorized", workers=1, chunksize=parallel.DEFAULT_CHUNKSIZE):
+    """
+    Add the `clean_text` column to a filtered DataFrame.
+    Each distinct normalized text is cleaned once and the result broadcast
+    to its duplicates; df.attrs["unique_rows"] records how many were cleaned.
+    `mode` picks clean_column() or a clean_text() call per text (same output).
+    With `workers` > 1 (None = one per CPU), chunks of the distinct texts
+    are cleaned in a process pool and reassembled in their original order;
+    lemmas the workers computed are merged into this process's table.
+    """
+    if mode not in CLEAN_MODES:
+        raise ValueError(f"unknown clean mode {mode!r} (expected one of {CLEAN_MODES})")
+    df = df.copy()
+    codes, uniques = dedup.unique_codes(df["text"], key=dedup.normalized_text)
+    cleaned = np.empty(len(uniques), dtype=object)
+    if workers == 1:
+        cleaned[:] = _clean_texts(uniques, mode)
+    else:
+        chunks = parallel.map_chunks(
+            partial(clean_chunk, mode=mode),
+            pd.Series(uniques, dtype=object),
+            workers=workers,
+            chunksize=chunksize,
+            initializer=init_worker,
+        )
+        start = 0
+        for texts, lemmas in chunks:
+            cleaned[start:start + len(texts)] = texts
+            start += len(texts)
+            lemma_cache.update(lemmas)
+        # map_chunks runs init_worker in this process when it doesn't fork
+        lemma_cache.track_new = False
+    df["clean_text"] = cleaned.take(codes)
+    df.attrs["unique_rows"] = len(uniques)
+    lemma_cache.save()
+    return df
+
+def clean_chunk(texts, mode="vectorized"):
+    """Clean a chunk of texts in a worker; returns (cleaned texts, lemmas new to this worker)"""
+    return _clean_texts(texts, mode), lemma_cache.pop_new()
+
+def init_worker():
+    """
+    Stop words and the lemma table are set up once per worker process, at
+    import (or inherited on fork); only lemmas computed from here on are
+    recorded and sent back with each chunk.
+    """
+    lemma_cache.pop_new()
+    lemma_cache.track_new = True
+
+def main(company=DEFAULT_COMPANY, mode="vectorized", workers=1, tokens=False):
+    paths = company_paths(company)
+
+    # Load data
+    df = pd.read_csv(paths["filtered"])
+
+    df = clean_dataframe(df, mode=mode, workers=workers)
 
-    words = text.split()
-    words = [lemmatizer.lemmatize(w) for w in words if w not in stop_words]
+    df.to_csv(paths["clean"], index=False)
 
-    return " ".join(words)
+    unique_rows = df.attrs["unique_rows"]
+    print("Text cleaning completed")
+    print(f"Cleaned {unique_rows} unique texts for {len(df)} rows "
+          f"({1 - unique_rows / max(len(df), 1):.1%} duplicates)")
+    print("Saved to:", paths["clean"])
 
-df["clean_text"] = df["text"].apply(clean_text)
+    if tokens:
+        corpus = token_corpus.write(df["clean_text"], paths["tokens"])
+        print(f"Token corpus: {len(corpus.tokens)} tokens, vocabulary of {len(corpus.vocab)}")
+        print("Saved to:", paths["tokens"])
 
-df.to_csv(output_path, index=False)
+if __name__ == "__main__":
+    import argparse
 
-print("Text cleaning completed")
-print("Saved to:", output_path)
+    parser = argparse.ArgumentParser(description="Clean filtered employee texts")
+    parser.add_argument("--company", default=DEFAULT_COMPANY, help="company id (default: microsoft)")
+    parser.add_argument(
+        "--mode",
+        choices=CLEAN_MODES,
+        default="vectorized",
+        help="whole-column string ops or per-row function (default: vectorized)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="clean text chunks in this many processes (0 = one per CPU; default: 1)",
+    )
+    parser.add_argument(
+        "--tokens",
+        action="store_true",
+        help="also write the memory-mappable token corpus (ids, offsets, vocabulary)",
+    )
+    args = parser.parse_args()
+    main(args.company, mode=args.mode, workers=args.workers or None, tokens=args.tokens)
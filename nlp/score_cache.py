@@ -0,0 +1,140 @@
+"""
+Persistent cache of VADER compound scores.
+
+Scores are stored in an SQLite file under .pipeline_cache/, keyed by the
+analyzer version and a 16-byte BLAKE2b digest of the text, so re-runs and
+re-imports only score texts the installed vaderSentiment release has not
+scored before. Lookups and inserts are batched: one join against a
+temporary table of keys and one transaction per batch of new scores.
+
+The cache is bounded: scores of other analyzer versions are dropped when
+the cache is opened, and once it holds more than `max_entries` scores the
+oldest-stored ones are evicted down to 90% of the limit.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from importlib import metadata
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_PATH = os.path.join(BASE_DIR, ".pipeline_cache", "vader_scores.sqlite")
+DEFAULT_MAX_ENTRIES = 2_000_000
+
+
+def analyzer_version():
+    try:
+        return f"vaderSentiment-{metadata.version('vaderSentiment')}"
+    except metadata.PackageNotFoundError:
+        return "vaderSentiment-unknown"
+
+
+def text_key(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class ScoreCache:
+    """Compound scores by text for one analyzer version, with hit/miss counts"""
+
+    def __init__(self, path=CACHE_PATH, version=None, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.version = version or analyzer_version()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._pid = None
+        self._entries = 0  # upper bound on the stored scores since the last count
+
+    def _connect(self):
+        # A connection must not cross a fork; pool workers open their own
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(scores)")]
+            if columns and "stored_at" not in columns:
+                conn.execute("DROP TABLE scores")  # cache from before eviction existed
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS scores ("
+                " version TEXT NOT NULL, key BLOB NOT NULL, compound REAL NOT NULL,"
+                " stored_at INTEGER NOT NULL, PRIMARY KEY (version, key)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS scores_age ON scores (stored_at)")
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS lookup (pos INTEGER PRIMARY KEY, key BLOB NOT NULL)")
+            # Scores of another analyzer version are never read again
+            conn.execute("DELETE FROM scores WHERE version != ?", (self.version,))
+            conn.commit()
+            self._conn, self._pid = conn, os.getpid()
+            self._entries = conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+        return self._conn
+
+    def get_many(self, texts):
+        """Cached scores aligned with `texts` (strings), NaN where not cached"""
+        scores = np.full(len(texts), np.nan)
+        if len(texts):
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM lookup")
+                conn.executemany("INSERT INTO lookup VALUES (?, ?)",
+                                 ((pos, text_key(text)) for pos, text in enumerate(texts)))
+                rows = conn.execute(
+                    "SELECT lookup.pos, scores.compound FROM lookup"
+                    " JOIN scores ON scores.version = ? AND scores.key = lookup.key",
+                    (self.version,),
+                ).fetchall()
+            if rows:
+                positions, values = zip(*rows)
+                scores[list(positions)] = values
+
+        found = int(np.count_nonzero(~np.isnan(scores)))
+        self.hits += found
+        self.misses += len(scores) - found
+        return scores
+
+    def put_many(self, texts, scores):
+        """Store the scores of `texts` (strings) in one transaction"""
+        if not len(texts):
+            return
+        conn = self._connect()
+        stored_at = int(time.time())
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO scores VALUES (?, ?, ?, ?)",
+                ((self.version, text_key(text), float(score), stored_at)
+                 for text, score in zip(texts, scores)),
+            )
+        self._entries += len(texts)
+        if self.max_entries is not None and self._entries > self.max_entries:
+            self.evict()
+
+    def evict(self):
+        """Drop the oldest-stored scores down to 90% of `max_entries`"""
+        conn = self._connect()
+        with conn:
+            entries = conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+            excess = entries - int(self.max_entries * 0.9)
+            if entries > self.max_entries and excess > 0:
+                conn.execute(
+                    "DELETE FROM scores WHERE (version, key) IN"
+                    " (SELECT version, key FROM scores ORDER BY stored_at LIMIT ?)",
+                    (excess,),
+                )
+                entries -= excess
+        self._entries = entries
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+    def close(self):
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
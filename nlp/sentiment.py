@@ -1,20 +1,22 @@
+import numpy as np
 import pandas as pd
 import os
+import sys
 from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 
 # ===============================
 # Paths
 # ===============================
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-input_path = os.path.join(BASE_DIR, "microsoft_employee_clean.csv")
-output_path = os.path.join(BASE_DIR, "microsoft_employee_sentiment.csv")
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
 
-# ===============================
-# Load cleaned data
-# ===============================
-df = pd.read_csv(input_path)
+from nlp import dedup, incremental, parallel
+from nlp.companies import DEFAULT_COMPANY, company_paths
+from nlp.score_cache import ScoreCache
 
 analyzer = SentimentIntensityAnalyzer()
+score_cache = ScoreCache()
 
 # ===============================
 # CALIBRATED SENTIMENT FUNCTION
@@ -22,25 +24,116 @@ analyzer = SentimentIntensityAnalyzer()
 # Reason:
 # Default VADER thresholds are too harsh for employee/corporate language.
 # These thresholds produce realistic, non-fake distributions.
-def get_sentiment(text):
-    score = analyzer.polarity_scores(str(text))["compound"]
+POSITIVE_THRESHOLD = 0.2
+NEGATIVE_THRESHOLD = -0.2
 
-    if score >= 0.2:
+def sentiment_label(score):
+    if score >= POSITIVE_THRESHOLD:
         return "Positive"
-    elif score <= -0.2:
+    elif score <= NEGATIVE_THRESHOLD:
         return "Negative"
     else:
         return "Neutral"
 
-# Apply sentiment classification
-df["sentiment"] = df["clean_text"].apply(get_sentiment)
+def get_sentiment(text):
+    return sentiment_label(analyzer.polarity_scores(str(text))["compound"])
 
-# Save results
-df.to_csv(output_path, index=False)
+def sentiment_labels(scores):
+    """Vectorized sentiment_label() over an array of compound scores"""
+    scores = np.asarray(scores, dtype=float)
+    return np.select(
+        [scores >= POSITIVE_THRESHOLD, scores <= NEGATIVE_THRESHOLD],
+        ["Positive", "Negative"],
+        "Neutral",
+    ).astype(object)
 
-# ===============================
-# Debug summary (VERY USEFUL)
-# ===============================
-print("Sentiment analysis completed")
-print(df["sentiment"].value_counts())
-print("Saved to:", output_path)
+def _score_chunk(texts):
+    return np.array([analyzer.polarity_scores(text)["compound"] for text in texts], dtype=float)
+
+def score_texts(texts, workers=1, chunksize=parallel.DEFAULT_CHUNKSIZE):
+    """
+    VADER compound score of every text as a float array.
+    With `workers` > 1 (None = one per CPU), chunks of texts are scored in
+    a process pool, each worker using its own module-level analyzer, and
+    the scores come back in input order.
+    """
+    texts = pd.Series([str(text) for text in texts], dtype=object)
+    if workers == 1:
+        return _score_chunk(texts)
+    chunks = parallel.map_chunks(_score_chunk, texts, workers=workers, chunksize=chunksize)
+    return np.concatenate(chunks) if chunks else np.zeros(0)
+
+def compound_scores(texts, cache=score_cache, workers=1, chunksize=parallel.DEFAULT_CHUNKSIZE):
+    """
+    score_texts() through the score cache: scores are looked up in `cache`
+    first and only texts it doesn't have are scored, then added to it;
+    cache=None scores everything.
+    """
+    texts = [str(text) for text in texts]
+    if cache is None:
+        return score_texts(texts, workers=workers, chunksize=chunksize)
+
+    scores = cache.get_many(texts)
+    missing = np.flatnonzero(np.isnan(scores))
+    if len(missing):
+        new_texts = [texts[i] for i in missing]
+        scores[missing] = score_texts(new_texts, workers=workers, chunksize=chunksize)
+        cache.put_many(new_texts, scores[missing])
+    return scores
+
+def score_dataframe(df, cache=score_cache, workers=1, chunksize=parallel.DEFAULT_CHUNKSIZE):
+    """
+    Add the `sentiment` column to a cleaned DataFrame.
+    Each distinct clean text is scored once (or read from the score cache)
+    and the label broadcast to its duplicates; df.attrs["unique_rows"]
+    records how many distinct texts there were. `workers` as in score_texts().
+    """
+    df = df.copy()
+    codes, uniques = dedup.unique_codes(df["clean_text"])
+    scores = compound_scores(uniques, cache, workers=workers, chunksize=chunksize)
+    df["sentiment"] = sentiment_labels(scores).take(codes)
+    df.attrs["unique_rows"] = len(uniques)
+    return df
+
+def report_cache(cache=score_cache):
+    stats = cache.stats()
+    if stats["hits"] or stats["misses"]:
+        print(f"[CACHE] VADER scores: {stats['hits']} cached, {stats['misses']} scored "
+              f"({stats['hit_rate']:.1%} hit rate)")
+
+def main(company=DEFAULT_COMPANY, workers=1):
+    paths = company_paths(company)
+
+    # Load cleaned data
+    df = pd.read_csv(paths["clean"])
+
+    # Apply sentiment classification
+    df = score_dataframe(df, workers=workers)
+
+    # Save results (published: the API reads this file)
+    incremental.publish_csv(df, paths["sentiment"])
+
+    # ===============================
+    # Debug summary (VERY USEFUL)
+    # ===============================
+    unique_rows = df.attrs["unique_rows"]
+    print("Sentiment analysis completed")
+    print(f"Scored {unique_rows} unique texts for {len(df)} rows "
+          f"({1 - unique_rows / max(len(df), 1):.1%} duplicates)")
+    report_cache()
+    print(df["sentiment"].value_counts())
+    print("Saved to:", paths["sentiment"])
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Score cleaned texts with calibrated VADER")
+    parser.add_argument("--company", default=DEFAULT_COMPANY, help="company id (default: microsoft)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="score text chunks in this many processes (0 = one per CPU; default: 1)",
+    )
+    args = parser.parse_args()
+    main(args.company, workers=args.workers or None)
@@ -0,0 +1,118 @@
+"""
+Content-addressed artifact cache for pipeline stages.
+
+A stage's cache key is a hash of:
+- the keys of its inputs (source stages are keyed by the raw file's bytes),
+- its parameters (thresholds, keyword lists, drift settings, ...),
+- the source code of the modules that implement it.
+
+Keys therefore change whenever anything upstream changes, and an unchanged
+stage can be restored from (or skipped thanks to) its cached output.
+
+Every new raw file adds new outputs, so the cache is bounded: a restored
+entry's mtime is refreshed, and after each store the least recently used
+entries are evicted until the cache fits in `max_bytes`.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import pickle
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(BASE_DIR, ".pipeline_cache", "stages")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+_code_versions = {}
+
+
+def file_key(path, block_size=1 << 20):
+    """sha256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def code_version(modules):
+    """Hash of the source files of the given modules"""
+    digest = hashlib.sha256()
+    for module in modules:
+        path = inspect.getsourcefile(module)
+        if path not in _code_versions:
+            _code_versions[path] = file_key(path)
+        digest.update(_code_versions[path].encode("ascii"))
+    return digest.hexdigest()
+
+
+def stage_key(name, input_keys, params, modules):
+    """Cache key for one stage run"""
+    payload = json.dumps(
+        {
+            "stage": name,
+            "inputs": list(input_keys),
+            "params": params,
+            "code": code_version(modules),
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class StageCache:
+    """Pickled stage outputs stored under CACHE_DIR/<key>.pkl, LRU-evicted past `max_bytes`"""
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def contains(self, key):
+        return key is not None and os.path.exists(self._path(key))
+
+    def load(self, key):
+        path = self._path(key)
+        with open(path, "rb") as f:
+            value = pickle.load(f)
+        os.utime(path)  # mark as recently used
+        return value
+
+    def store(self, key, value):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        if self.max_bytes is not None:
+            self.evict(keep=path)
+
+    def evict(self, keep=None):
+        """Remove least recently used entries until the cache fits in `max_bytes`"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".pkl"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:  # removed by a concurrent run
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
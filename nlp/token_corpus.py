@@ -0,0 +1,148 @@
+"""
+Tokenized corpus: cleaned texts stored as integer vocabulary ids.
+
+A corpus directory holds
+
+    tokens.npy    int32 ids of every row's tokens, concatenated
+    offsets.npy   int64 row boundaries; row i is tokens[offsets[i]:offsets[i + 1]]
+    vocab.txt     one token per line, the line number being its id
+
+Both arrays are memory-mapped on load, so downstream analytics can count,
+slice and compare tokens as integers without re-splitting `clean_text`.
+"""
+
+import os
+import sys
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+# ===============================
+# Paths
+# ===============================
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from nlp.companies import DEFAULT_COMPANY, company_paths
+
+TOKENS_FILE = "tokens.npy"
+OFFSETS_FILE = "offsets.npy"
+VOCAB_FILE = "vocab.txt"
+
+
+# ===============================
+# Encoding
+# ===============================
+def encode(texts):
+    """
+    (tokens, offsets, vocab) for whitespace-separated texts; missing
+    values are empty rows. Ids are numbered in order of first appearance.
+    """
+    rows = [text.split() if isinstance(text, str) else [] for text in texts]
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum([len(row) for row in rows], out=offsets[1:])
+
+    codes, vocab = pd.factorize(pd.Series(list(chain.from_iterable(rows)), dtype=object))
+    if len(vocab) > np.iinfo(np.int32).max:
+        raise ValueError(f"vocabulary of {len(vocab)} tokens does not fit int32 ids")
+    return codes.astype(np.int32), offsets, list(vocab)
+
+
+def _replace_file(path, write):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write(texts, directory):
+    """Encode `texts` into a corpus directory; returns the loaded TokenCorpus"""
+    tokens, offsets, vocab = encode(texts)
+    os.makedirs(directory, exist_ok=True)
+
+    def save_array(array):
+        def _write(path):
+            with open(path, "wb") as f:
+                np.save(f, array)
+        return _write
+
+    def save_vocab(path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(f"{token}\n" for token in vocab)
+
+    _replace_file(os.path.join(directory, TOKENS_FILE), save_array(tokens))
+    _replace_file(os.path.join(directory, OFFSETS_FILE), save_array(offsets))
+    _replace_file(os.path.join(directory, VOCAB_FILE), save_vocab)
+    return TokenCorpus(tokens, offsets, vocab)
+
+
+# ===============================
+# Reading
+# ===============================
+class TokenCorpus:
+    """Rows of int32 token ids backed by flat `tokens`/`offsets` arrays"""
+
+    def __init__(self, tokens, offsets, vocab):
+        self.tokens = tokens
+        self.offsets = offsets
+        self.vocab = vocab
+        self._ids = None
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        mode = "r" if mmap else None
+        tokens = np.load(os.path.join(directory, TOKENS_FILE), mmap_mode=mode)
+        offsets = np.load(os.path.join(directory, OFFSETS_FILE), mmap_mode=mode)
+        with open(os.path.join(directory, VOCAB_FILE), "r", encoding="utf-8") as f:
+            vocab = f.read().splitlines()
+        return cls(tokens, offsets, vocab)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def row(self, i):
+        """Token ids of row `i` (a view, no copy)"""
+        return self.tokens[self.offsets[i]:self.offsets[i + 1]]
+
+    def row_tokens(self, i):
+        return [self.vocab[token] for token in self.row(i)]
+
+    def text(self, i):
+        """Row `i` as the space-joined `clean_text` it was encoded from"""
+        return " ".join(self.row_tokens(i))
+
+    def lengths(self):
+        return np.diff(self.offsets)
+
+    def row_ids(self):
+        """Row index of every token, aligned with `tokens`"""
+        return np.repeat(np.arange(len(self), dtype=np.int64), self.lengths())
+
+    def token_id(self, token):
+        """Id of `token`, or -1 if it is not in the vocabulary"""
+        if self._ids is None:
+            self._ids = {word: i for i, word in enumerate(self.vocab)}
+        return self._ids.get(token, -1)
+
+    def counts(self):
+        """Occurrences of every vocabulary id across the corpus"""
+        return np.bincount(self.tokens, minlength=len(self.vocab))
+
+
+def main(company=DEFAULT_COMPANY):
+    paths = company_paths(company)
+
+    df = pd.read_csv(paths["clean"])
+    corpus = write(df["clean_text"], paths["tokens"])
+
+    print(f"Encoded {len(corpus)} rows: {len(corpus.tokens)} tokens, vocabulary of {len(corpus.vocab)}")
+    print("Saved to:", paths["tokens"])
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Encode cleaned texts as a memory-mappable token corpus")
+    parser.add_argument("--company", default=DEFAULT_COMPANY, help="company id (default: microsoft)")
+    main(parser.parse_args().company)
@@ -3,41 +3,55 @@ import sys
 import os
 import time
 import threading
+import urllib.error
+import urllib.request
 from pathlib import Path
 
 # Get the base directory
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# NLP pipeline scripts
-nlp_scripts = [
-    "nlp/employee_filter.py",
-    "nlp/preprocess.py",
-    "nlp/sentiment.py",
-    "nlp/drift_detection.py"
-]
+# Readiness probes
+API_READY_URL = "http://localhost:5000/api/ready"
+FRONTEND_URL = "http://localhost:5173"
+API_READY_TIMEOUT = 30
+FRONTEND_READY_TIMEOUT = 90
 
-def run_nlp_pipeline():
-    """Run the NLP data processing pipeline"""
+def wait_until_ready(url, timeout, process=None, interval=0.25):
+    """
+    Poll `url` until it answers with a 2xx status.
+    Returns False on timeout or if `process` exits first.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            return False
+        try:
+            with urllib.request.urlopen(url, timeout=2) as response:
+                if 200 <= response.status < 300:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(interval)
+    return False
+
+def run_nlp_pipeline(**options):
+    """
+    Run the NLP data processing pipeline in-process.
+    `options` are nlp.pipeline.run_pipeline() keyword arguments (see
+    add_pipeline_args() there for the command line options): checkpoints,
+    incremental or streaming mode, one or all companies, the stage cache
+    and near-duplicate clustering. Each run writes a per-stage performance
+    report to pipeline_reports/.
+    """
     print("\n" + "="*80)
     print("[STAGE 1] DATA PROCESSING PIPELINE")
     print("="*80 + "\n")
 
-    for script in nlp_scripts:
-        print(f"[RUN] Running {script} ...")
-        
-        result = subprocess.run(
-            [sys.executable, script],
-            capture_output=True,
-            text=True,
-            cwd=BASE_DIR
-        )
+    # Imported here so check_dependencies() can install pandas etc. first
+    from nlp.pipeline import run_pipeline
 
-        if result.returncode != 0:
-            print(f"\n[ERROR] Error while running {script}")
-            print(result.stderr)
-            return False
-        else:
-            print(result.stdout)
+    if not run_pipeline(**options):
+        return False
     
     print("\n[SUCCESS] NLP Pipeline execution completed!\n")
     return True
@@ -66,7 +80,17 @@ def check_dependencies():
         else:
             print("[WARNING] Could not install Python dependencies")
             print(result.stderr)
-    
+
+    # Check NLTK corpora; never downloaded here, so offline hosts start
+    # without touching the network (stopwords fall back to the packaged
+    # list, lemmas to the persisted lemma table)
+    from nlp import nltk_setup
+
+    missing = nltk_setup.missing_resources()
+    if missing:
+        print(f"[WARNING] NLTK data not installed: {', '.join(missing)}; using offline fallbacks")
+        print("   To install it: python nlp/nltk_setup.py\n")
+
     # Check Node dependencies
     react_frontend_path = os.path.join(BASE_DIR, "react-frontend")
     if os.path.exists(react_frontend_path):
@@ -93,9 +117,9 @@ def start_flask_api():
     print("="*80 + "\n")
     
     print("Starting Flask API on http://localhost:5000...")
-    print("[WAIT] Waiting for API to initialize...\n")
+    print("[INFO] Serving the last published dataset until the pipeline finishes\n")
     
-    # Start Flask in a separate thread
+    # Start Flask in a separate process; readiness is probed by the caller
     api_process = subprocess.Popen(
         [sys.executable, "api_server.py"],
         stdout=subprocess.PIPE,
@@ -104,9 +128,6 @@ def start_flask_api():
         cwd=BASE_DIR
     )
     
-    time.sleep(2)  # Give Flask time to start
-    print("[SUCCESS] Flask API started\n")
-    
     return api_process
 
 def start_react_frontend():
@@ -139,11 +160,10 @@ def start_react_frontend():
             return None
         print("[SUCCESS] Node dependencies installed\n")
     
-    print("Starting React frontend development server...")
-    print("[WAIT] Waiting for frontend to compile...\n")
+    print("Starting React frontend development server...\n")
     
     try:
-        # Start Vite with proper error handling
+        # Start Vite with proper error handling; readiness is probed by the caller
         frontend_process = subprocess.Popen(
             "npm run dev",
             shell=True,
@@ -152,46 +172,72 @@ def start_react_frontend():
             text=True,
             cwd=react_frontend_path
         )
-        
-        time.sleep(5)  # Give Vite time to start
-        
-        # Check if process started successfully
-        if frontend_process.poll() is not None:
-            print("[ERROR] React frontend failed to start")
-            return None
-        
-        print("[SUCCESS] React frontend started\n")
         return frontend_process
     except Exception as e:
         print(f"[ERROR] Error starting frontend: {e}")
         return None
 
 def main():
+    import argparse
+
     print("\n" + "="*80)
     print("[EMPLOYEE BRAND PERCEPTION ANALYTICS - FULL STACK]")
     print("="*80 + "\n")
     
-    # Check dependencies
+    # Check dependencies (the pipeline options below need pandas etc.)
     check_dependencies()
+
+    from nlp.pipeline import add_pipeline_args, pipeline_options
+
+    parser = argparse.ArgumentParser(description="Run the full analytics stack")
+    add_pipeline_args(parser)
+    args = parser.parse_args()
     
-    # Run NLP pipeline
-    if not run_nlp_pipeline():
-        print("[FAILURE] Pipeline failed. Exiting.")
-        return
-    
-    # Start Flask API
+    # Start Flask API right away from the last published dataset; it
+    # hot-swaps to the new sentiment output once the pipeline publishes it
     api_process = start_flask_api()
     
-    # Start React Frontend
+    # Run NLP pipeline in parallel
+    pipeline_result = {}
+    
+    def pipeline_worker():
+        pipeline_result["ok"] = run_nlp_pipeline(**pipeline_options(args))
+        if pipeline_result["ok"]:
+            print("[SUCCESS] Pipeline published new data; the API picks it up on the next request\n")
+        else:
+            print("[FAILURE] Pipeline failed. The API keeps serving the previous dataset.\n")
+    
+    pipeline_thread = threading.Thread(target=pipeline_worker, name="nlp-pipeline", daemon=True)
+    pipeline_thread.start()
+    
+    # Start React Frontend (boots while the API and pipeline are starting)
     frontend_process = start_react_frontend()
     
+    # Wait for real readiness instead of fixed sleeps
+    if wait_until_ready(API_READY_URL, API_READY_TIMEOUT, process=api_process):
+        print("[SUCCESS] Flask API is ready\n")
+    else:
+        print(f"[ERROR] Flask API did not become ready within {API_READY_TIMEOUT}s\n")
+    
+    if frontend_process:
+        if wait_until_ready(FRONTEND_URL, FRONTEND_READY_TIMEOUT, process=frontend_process):
+            print("[SUCCESS] React frontend is ready\n")
+        elif frontend_process.poll() is not None:
+            print("[ERROR] React frontend failed to start\n")
+            frontend_process = None
+        else:
+            print(f"[WARNING] React frontend not ready after {FRONTEND_READY_TIMEOUT}s; still starting\n")
+    
     # Display final instructions
     print("="*80)
     print("[SUCCESS] ALL SYSTEMS RUNNING!")
     print("="*80)
     print("\n[DASHBOARD] Dashboard URL: http://localhost:5173")
     print("[API] API Server:    http://localhost:5000")
-    print("[HEALTH] Health Check:  http://localhost:5000/api/health\n")
+    print("[HEALTH] Health Check:  http://localhost:5000/api/health")
+    if pipeline_thread.is_alive():
+        print("[PIPELINE] Still running in the background; data refreshes when it finishes")
+    print()
     
     print("Press Ctrl+C to stop all services\n")
     print("="*80 + "\n")
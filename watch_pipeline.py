@@ -0,0 +1,164 @@
+"""
+Watch-mode pipeline daemon
+
+Polls the data directories for new or changed raw files
+({company}_employee_raw.csv), waits until a file has stopped changing
+(debounce), then runs that company's pipeline incrementally in a worker
+pool. The sentiment output is published atomically, so the API picks up
+new data without ever reading a partially written file.
+
+Usage:
+    python watch_pipeline.py [--interval 1] [--debounce 3] [--workers 2] [--run-now]
+                             [--score-workers 1]
+"""
+
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+from nlp.companies import company_list, company_paths
+from nlp.pipeline import run_company_captured
+
+
+class RawFileWatcher:
+    """
+    Tracks (size, mtime) of each company's raw file and reports companies
+    whose file changed and has then been stable for `debounce` seconds.
+    """
+
+    def __init__(self, companies, debounce=3.0):
+        self.companies = companies
+        self.debounce = debounce
+        self._seen = {company: self._signature(company) for company in companies}
+        self._changed_at = {}
+
+    @staticmethod
+    def _signature(company):
+        path = company_paths(company)["raw"]
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def poll(self):
+        """Return the companies whose raw file settled since the last poll"""
+        now = time.monotonic()
+        ready = []
+        for company in self.companies:
+            signature = self._signature(company)
+            if signature != self._seen[company]:
+                # Still being written: restart the debounce window
+                self._seen[company] = signature
+                if signature is not None:
+                    self._changed_at[company] = now
+                else:
+                    self._changed_at.pop(company, None)
+            elif company in self._changed_at and now - self._changed_at[company] >= self.debounce:
+                del self._changed_at[company]
+                ready.append(company)
+        return ready
+
+
+def ignore_sigint():
+    """
+    Pool initializer: Ctrl+C reaches the whole process group, but only the
+    daemon handles it, so in-flight appends and publishes finish cleanly
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def watch(interval=1.0, debounce=3.0, workers=2, run_now=False, companies=None,
+          score_workers=1):
+    """
+    Main daemon loop; runs until interrupted.
+    `score_workers` processes score each run's new texts (None = one per CPU).
+    """
+    companies = companies or company_list()
+    watcher = RawFileWatcher(companies, debounce=debounce)
+    running = {}      # company -> future
+    pending = set()   # changed again while a run was in progress
+    queued = list(companies) if run_now else []
+
+    print("\n" + "="*80)
+    print("[WATCH] PIPELINE WATCH MODE")
+    print("="*80)
+    for company in companies:
+        print(f"  {company:<10} {company_paths(company)['raw']}")
+    print(f"\n[WATCH] Polling every {interval}s, debounce {debounce}s, {workers} worker(s)")
+    print("Press Ctrl+C to stop\n")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=ignore_sigint) as pool:
+        try:
+            while True:
+                for company in watcher.poll():
+                    print(f"[CHANGE] {company}: raw file updated")
+                    if company in running:
+                        pending.add(company)
+                    elif company not in queued:
+                        queued.append(company)
+
+                while queued:
+                    company = queued.pop(0)
+                    print(f"[RUN] {company}: incremental pipeline started")
+                    running[company] = pool.submit(
+                        run_company_captured, company, incremental_mode=True,
+                        score_workers=score_workers,
+                    )
+
+                for company, future in list(running.items()):
+                    if not future.done():
+                        continue
+                    del running[company]
+                    try:
+                        summary, log = future.result()
+                    except Exception as e:
+                        print(f"[ERROR] {company}: worker failed: {e}")
+                        continue
+
+                    status = "published" if summary.get("ok") else "FAILED"
+                    print(f"\n----- {company.upper()} ({summary.get('mode', '-')}, "
+                          f"{summary.get('elapsed_s', 0):.2f}s) -----")
+                    print(log, end="")
+                    print(f"[DONE] {company}: {status}\n")
+
+                    if company in pending:
+                        pending.discard(company)
+                        queued.append(company)
+
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("\n[STOP] Waiting for running pipelines to finish...")
+
+    print("[STOP] Watcher stopped")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Process new raw data automatically")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between polls")
+    parser.add_argument("--debounce", type=float, default=3.0, help="seconds a file must be unchanged")
+    parser.add_argument("--workers", type=int, default=2, help="pipeline worker processes")
+    parser.add_argument("--run-now", action="store_true", help="process every company once at startup")
+    parser.add_argument(
+        "--score-workers",
+        type=int,
+        default=1,
+        help="processes scoring each run's new texts (0 = one per CPU; default: 1)",
+    )
+    args = parser.parse_args()
+
+    watch(
+        interval=args.interval,
+        debounce=args.debounce,
+        workers=args.workers,
+        run_now=args.run_now,
+        score_workers=args.score_workers or None,
+    )